@@ -0,0 +1,335 @@
+"""
+api.py
+
+ROLE
+----
+HTTP/JSON service exposing the pipeline next to the Streamlit UI.
+
+PURPOSE
+-------
+- POST /extract       report upload -> details + summary_data (+ raw_text)
+- POST /care-plan     {"patient", "summary"} -> treatment plan
+- POST /render-pdf    {"patient", "summary", "plan"} -> application/pdf
+- GET  /healthz       liveness
+
+NOTE
+----
+Plain ASGI, no web framework: run it with any ASGI server, e.g.
+
+    uvicorn backend.api:app --port 8000
+
+Uploads are accepted as a raw (streamed) request body or as
+multipart/form-data with a "file" field. Extraction (pypdf / OCR) runs
+in a process pool, the LLM call and PDF rendering in threads, so the
+event loop never blocks. Each endpoint has its own concurrency limit;
+a request over the limit gets 429 straight away instead of queueing.
+
+Error bodies never carry exception text (it can hold report text or
+paths): unexpected failures return a generic message with an error id,
+and the detail goes to the log under that id.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from backend.extractor import process_diagnosis_report
+from backend.planner import generate_full_care_plan
+from backend.preflight import QUEUE, PreflightError, preflight
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+MAX_JSON_BYTES = 1024 * 1024
+
+OCR_WORKERS = int(os.getenv("API_OCR_WORKERS", str(os.cpu_count() or 2)))
+
+# Requests in flight per endpoint
+LIMITS = {
+    "extract": int(os.getenv("API_EXTRACT_LIMIT", str(OCR_WORKERS * 2))),
+    "care-plan": int(os.getenv("API_CARE_PLAN_LIMIT", "8")),
+    "render-pdf": int(os.getenv("API_RENDER_LIMIT", "8")),
+    # Queued (heavy OCR) extractions running at once; others wait
+    "extract-heavy": int(os.getenv("API_HEAVY_LIMIT", "1"))
+}
+
+# Preflight rejection code -> HTTP status
+PREFLIGHT_STATUS = {
+    "empty": 400,
+    "unsupported": 415,
+    "too_large": 413,
+    "too_many_pages": 413,
+    "too_costly": 413,
+    "corrupt": 422
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[List] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+# =====================================================
+# REQUEST / RESPONSE HELPERS
+# =====================================================
+def _header(scope: Dict, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+async def _read_body(receive: Callable, limit: int) -> bytes:
+    """
+    Stream the request body in, failing fast once it exceeds `limit`.
+    """
+    body = bytearray()
+
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "Client disconnected")
+
+        body += message.get("body", b"")
+        if len(body) > limit:
+            raise HTTPError(413, f"Request body larger than {limit} bytes")
+
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+def _multipart_file(content_type: str, body: bytes) -> bytes:
+    """
+    Bytes of the "file" part (or the first file part) of a multipart body.
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise HTTPError(400, "Malformed multipart body")
+
+    fallback = None
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True) or b""
+        if fallback is None and part.get_filename():
+            fallback = part.get_payload(decode=True) or b""
+
+    if fallback is None:
+        raise HTTPError(400, "No file part in multipart body")
+    return fallback
+
+
+async def _read_upload(scope: Dict, receive: Callable) -> bytes:
+    body = await _read_body(receive, MAX_UPLOAD_BYTES)
+    content_type = _header(scope, b"content-type")
+
+    if content_type.startswith("multipart/form-data"):
+        body = _multipart_file(content_type, body)
+
+    if not body:
+        raise HTTPError(400, "Empty upload")
+    return body
+
+
+async def _read_json(receive: Callable) -> Dict:
+    body = await _read_body(receive, MAX_JSON_BYTES)
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Body is not valid JSON")
+
+    if not isinstance(data, dict):
+        raise HTTPError(400, "JSON body must be an object")
+    return data
+
+
+async def _send(
+    send: Callable,
+    status: int,
+    body: bytes,
+    content_type: str,
+    headers: Optional[List[Tuple[bytes, bytes]]] = None
+) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *(headers or [])
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send: Callable, status: int, data, headers=None) -> None:
+    body = json.dumps(data, default=str, ensure_ascii=False).encode("utf-8")
+    await _send(send, status, body, "application/json; charset=utf-8", headers)
+
+
+# =====================================================
+# ENDPOINTS
+# =====================================================
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _ocr_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    return _POOL
+
+
+async def extract(scope: Dict, receive: Callable, send: Callable) -> None:
+    file_bytes = await _read_upload(scope, receive)
+
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    layout = query.get("layout", ["0"])[0] in ("1", "true")
+    roi = query.get("roi", ["0"])[0] in ("1", "true")
+    include_text = query.get("raw_text", ["1"])[0] in ("1", "true")
+
+    try:
+        checked = preflight(file_bytes)
+    except PreflightError as e:
+        raise HTTPError(PREFLIGHT_STATUS.get(e.code, 422), e.message)
+
+    loop = asyncio.get_running_loop()
+    if checked.decision == QUEUE:
+        async with _semaphore("extract-heavy"):
+            result = await loop.run_in_executor(
+                _ocr_pool(), process_diagnosis_report, file_bytes, layout, roi
+            )
+    else:
+        result = await loop.run_in_executor(
+            _ocr_pool(), process_diagnosis_report, file_bytes, layout, roi
+        )
+
+    if not include_text:
+        result.pop("raw_text", None)
+
+    await _send_json(send, 200, result)
+
+
+async def care_plan(scope: Dict, receive: Callable, send: Callable) -> None:
+    data = await _read_json(receive)
+    if not isinstance(data.get("summary"), dict):
+        raise HTTPError(400, "'summary' object is required")
+
+    try:
+        plan = await asyncio.to_thread(
+            generate_full_care_plan, data.get("patient") or {}, data["summary"]
+        )
+    except RuntimeError:
+        error_id = uuid.uuid4().hex[:12]
+        logger.exception("Care-plan generation failed [%s]", error_id)
+        raise HTTPError(502, f"Care-plan generation failed (error id {error_id})")
+
+    await _send_json(send, 200, plan)
+
+
+async def render_pdf(scope: Dict, receive: Callable, send: Callable) -> None:
+    data = await _read_json(receive)
+    if not isinstance(data.get("plan"), dict):
+        raise HTTPError(400, "'plan' object is required")
+
+    # reportlab is only loaded once a PDF is actually requested
+    from backend.pdf_builder import DEFAULT_FILENAME, render_treatment_plan_pdf
+
+    pdf = await asyncio.to_thread(
+        render_treatment_plan_pdf,
+        data.get("patient") or {},
+        data.get("summary") or {},
+        data["plan"]
+    )
+
+    await _send(send, 200, pdf, "application/pdf", [
+        (b"content-disposition", f'attachment; filename="{DEFAULT_FILENAME}"'.encode("latin-1"))
+    ])
+
+
+async def healthz(scope: Dict, receive: Callable, send: Callable) -> None:
+    await _send_json(send, 200, {"status": "ok"})
+
+
+Handler = Callable[[Dict, Callable, Callable], Awaitable[None]]
+
+# (method, path) -> (limit name or None, handler)
+ROUTES: Dict[Tuple[str, str], Tuple[Optional[str], Handler]] = {
+    ("POST", "/extract"): ("extract", extract),
+    ("POST", "/care-plan"): ("care-plan", care_plan),
+    ("POST", "/render-pdf"): ("render-pdf", render_pdf),
+    ("GET", "/healthz"): (None, healthz)
+}
+
+
+# =====================================================
+# ASGI APPLICATION
+# =====================================================
+_SEMAPHORES: Dict[str, asyncio.Semaphore] = {}
+
+
+def _semaphore(name: str) -> asyncio.Semaphore:
+    sem = _SEMAPHORES.get(name)
+    if sem is None:
+        sem = _SEMAPHORES[name] = asyncio.Semaphore(LIMITS[name])
+    return sem
+
+
+async def _lifespan(receive: Callable, send: Callable) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: Dict, receive: Callable, send: Callable) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path = scope["path"].rstrip("/") or "/"
+    route = ROUTES.get((scope["method"], path))
+    if route is None:
+        paths = {p for _, p in ROUTES}
+        status = 405 if path in paths else 404
+        await _send_json(send, status, {"error": "Not found" if status == 404 else "Method not allowed"})
+        return
+
+    limit, handler = route
+
+    try:
+        if limit is None:
+            await handler(scope, receive, send)
+            return
+
+        sem = _semaphore(limit)
+        if sem.locked():
+            raise HTTPError(429, f"Too many concurrent '{limit}' requests", [(b"retry-after", b"1")])
+
+        async with sem:
+            await handler(scope, receive, send)
+
+    except HTTPError as e:
+        await _send_json(send, e.status, {"error": e.message}, e.headers)
+    except Exception:
+        error_id = uuid.uuid4().hex[:12]
+        logger.exception("Unhandled error on %s %s [%s]", scope["method"], scope["path"], error_id)
+        await _send_json(send, 500, {"error": "Internal server error", "error_id": error_id})
@@ -0,0 +1,192 @@
+"""
+classifier.py
+
+ROLE
+----
+Scored multi-class report type classifier.
+
+PURPOSE
+-------
+- Classify a report as lab, radiology, ECG, discharge summary or
+  pathology (or generic "diagnosis" when nothing stands out)
+- Read only the first HEAD_CHARS characters, in one pass
+- Return a confidence so callers can route the report to only the
+  extractors it needs
+
+NOTE
+----
+Each unigram / bigram in KEYWORD_WEIGHTS adds its weights once per
+report (presence, not frequency), so long documents do not drown out
+short ones. Confidence is the softmax probability of the winning class
+against the other classes and a fixed "diagnosis" baseline.
+"""
+
+import math
+import re
+from typing import Dict, NamedTuple
+
+HEAD_CHARS = 8192
+
+REPORT_TYPES = ("lab", "radiology", "ecg", "discharge", "pathology")
+DEFAULT_TYPE = "diagnosis"
+
+# Score the generic type gets without any evidence
+_BASELINE = 1.0
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+# =====================================================
+# KEYWORD WEIGHTS
+# =====================================================
+# term (unigram or "bigram") -> {report_type: weight}
+KEYWORD_WEIGHTS: Dict[str, Dict[str, float]] = {
+    # Lab
+    "reference range": {"lab": 3.0},
+    "biological reference": {"lab": 3.0},
+    "reference interval": {"lab": 3.0},
+    "test name": {"lab": 2.0},
+    "complete blood": {"lab": 3.0},
+    "cbc": {"lab": 2.5},
+    "lipid profile": {"lab": 3.0},
+    "liver function": {"lab": 2.5},
+    "kidney function": {"lab": 2.5},
+    "renal function": {"lab": 2.0},
+    "thyroid profile": {"lab": 3.0},
+    "hemoglobin": {"lab": 1.0},
+    "haemoglobin": {"lab": 1.0},
+    "glucose": {"lab": 1.0},
+    "creatinine": {"lab": 1.0},
+    "cholesterol": {"lab": 1.0},
+    "hba1c": {"lab": 1.5},
+    "serum": {"lab": 1.0},
+    "plasma": {"lab": 0.5},
+    "mg dl": {"lab": 1.5},
+    "g dl": {"lab": 1.5},
+    "mmol l": {"lab": 1.5},
+    "units": {"lab": 0.5},
+    "sample": {"lab": 0.5, "pathology": 0.5},
+    "specimen": {"lab": 0.5, "pathology": 1.0},
+    "laboratory": {"lab": 2.0},
+
+    # Radiology
+    "radiology": {"radiology": 3.0},
+    "radiologist": {"radiology": 3.0},
+    "ct scan": {"radiology": 3.0},
+    "ct": {"radiology": 1.5},
+    "hrct": {"radiology": 3.0},
+    "mri": {"radiology": 3.0},
+    "x ray": {"radiology": 3.0},
+    "xray": {"radiology": 3.0},
+    "radiograph": {"radiology": 3.0},
+    "ultrasound": {"radiology": 3.0},
+    "usg": {"radiology": 3.0},
+    "sonography": {"radiology": 3.0},
+    "doppler": {"radiology": 2.0},
+    "mammogram": {"radiology": 3.0},
+    "mammography": {"radiology": 3.0},
+    "imaging": {"radiology": 2.0},
+    "contrast": {"radiology": 1.5},
+    "opacity": {"radiology": 2.0},
+    "lesion": {"radiology": 1.0, "pathology": 0.5},
+    "technique": {"radiology": 1.0},
+    "findings": {"radiology": 0.5},
+    "impression": {"radiology": 0.5, "ecg": 0.5},
+
+    # ECG
+    "ecg": {"ecg": 3.0},
+    "ekg": {"ecg": 3.0},
+    "electrocardiogram": {"ecg": 3.0},
+    "sinus rhythm": {"ecg": 3.0},
+    "sinus tachycardia": {"ecg": 2.5},
+    "sinus bradycardia": {"ecg": 2.5},
+    "qrs": {"ecg": 3.0},
+    "qtc": {"ecg": 3.0},
+    "pr interval": {"ecg": 3.0},
+    "qt interval": {"ecg": 3.0},
+    "st segment": {"ecg": 2.0},
+    "st elevation": {"ecg": 2.0},
+    "t wave": {"ecg": 2.0},
+    "axis": {"ecg": 1.0},
+    "bpm": {"ecg": 1.5},
+    "leads": {"ecg": 1.0},
+
+    # Discharge summary
+    "discharge summary": {"discharge": 5.0},
+    "date of admission": {"discharge": 3.0},
+    "date of discharge": {"discharge": 3.0},
+    "hospital course": {"discharge": 3.0},
+    "course in": {"discharge": 1.5},
+    "discharge medications": {"discharge": 3.0},
+    "condition at": {"discharge": 1.5},
+    "advice on": {"discharge": 1.0},
+    "discharged": {"discharge": 2.0},
+    "discharge": {"discharge": 1.5},
+    "admission": {"discharge": 1.0},
+    "admitted": {"discharge": 1.5},
+
+    # Pathology
+    "histopathology": {"pathology": 5.0},
+    "histopathological": {"pathology": 5.0},
+    "histology": {"pathology": 3.0},
+    "cytology": {"pathology": 3.0},
+    "biopsy": {"pathology": 3.0},
+    "fnac": {"pathology": 3.0},
+    "gross description": {"pathology": 3.0},
+    "microscopic description": {"pathology": 3.0},
+    "microscopic": {"pathology": 2.0},
+    "microscopy": {"pathology": 1.0},
+    "gross": {"pathology": 1.0},
+    "margins": {"pathology": 2.0},
+    "carcinoma": {"pathology": 2.0},
+    "pathologist": {"pathology": 2.0},
+    "block": {"pathology": 0.5},
+}
+
+
+class ReportClass(NamedTuple):
+    label: str
+    confidence: float
+    scores: Dict[str, float]
+
+
+# =====================================================
+# CLASSIFIER
+# =====================================================
+def classify_report(text: str, head_chars: int = HEAD_CHARS) -> ReportClass:
+    """
+    Classify a report from its first `head_chars` characters.
+
+    Args:
+        text (str): Report text
+        head_chars (int): How much of the report to read
+
+    Returns:
+        ReportClass: Winning label, its confidence and raw scores
+    """
+
+    scores = dict.fromkeys(REPORT_TYPES, 0.0)
+    seen = set()
+    prev = None
+
+    for match in _TOKEN.finditer(text[:head_chars].lower()):
+        token = match.group()
+
+        for term in (token, f"{prev} {token}" if prev else None):
+            if term in KEYWORD_WEIGHTS and term not in seen:
+                seen.add(term)
+                for report_type, weight in KEYWORD_WEIGHTS[term].items():
+                    scores[report_type] += weight
+
+        prev = token
+
+    label = max(scores, key=scores.get)
+    if scores[label] <= _BASELINE:
+        label = DEFAULT_TYPE
+
+    # Softmax over every class plus the generic baseline
+    exps = {k: math.exp(v) for k, v in scores.items()}
+    exps[DEFAULT_TYPE] = math.exp(_BASELINE)
+    confidence = exps[label] / sum(exps.values())
+
+    return ReportClass(label, round(confidence, 3), scores)
@@ -1,144 +1,232 @@
-import re
+from contextlib import nullcontext
 from io import BytesIO
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from backend.field_engine import scan_fields
+from backend.preflight import IMAGE_KINDS, PAGE_MEGAPIXELS, QUEUE, heavy_slot, preflight
+from backend.profiling import annotate, profiled
+from backend.telemetry import count, span
+from backend.pipeline import (  # noqa: F401 -- re-exported
+    analyse_text,
+    detect_report_type,
+    extract_chief_complaint,
+    extract_diagnosis,
+    patient_age,
+    patient_gender,
+    patient_name
+)
+
+# pypdf / pdf2image / pytesseract / PIL / python-docx / pdfplumber are
+# imported on first use: workers, the API and CLI tools start without
+# paying for formats and paths they never touch
+if TYPE_CHECKING:
+    from PIL import Image
+    from backend.layout import DocumentLayout
+
+# Tesseract / poppler paths (Streamlit Cloud / Docker safe)
+TESSERACT_CMD = "./bin/tesseract"
+POPPLER_PATH = "./bin/poppler"
+
+# Photos are downscaled to one A4 page at 300 dpi before OCR
+MAX_OCR_PIXELS = int(PAGE_MEGAPIXELS * 1e6)
+def _pytesseract():
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+def extract_text_from_pdf(pdf_bytes: bytes, roi: bool = False) -> str:
+    from backend.text_layer import extract_pages, get_backend
 
-from pypdf import PdfReader
-from pdf2image import convert_from_bytes
-import pytesseract
-from PIL import Image
-
-# Tesseract path (Streamlit Cloud / Docker safe)
-pytesseract.pytesseract.tesseract_cmd = "./bin/tesseract"
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
     text = ""
 
-    # Try digital PDF extraction
+    # Try digital PDF extraction (pdftotext / pypdf, see text_layer)
     try:
-        reader = PdfReader(BytesIO(pdf_bytes))
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
+        backend = get_backend()
+        with span("pdf.read", backend=backend.name):
+            pages = extract_pages(pdf_bytes, backend)
+            annotate(pages=len(pages), text_backend=backend.name)
+            for page_text in pages:
+                if page_text:
+                    text += page_text + "\n"
     except Exception:
         pass
 
     # If very little text → OCR
     if len(text.strip()) < 200:
-        images = convert_from_bytes(
-            pdf_bytes,
-            dpi=300,
-            poppler_path="./bin/poppler"
-        )
-        for img in images:
-            text += pytesseract.image_to_string(img) + "\n"
+        from pdf2image import convert_from_bytes
+
+        with span("pdf.rasterise"):
+            images = convert_from_bytes(
+                pdf_bytes,
+                dpi=300,
+                poppler_path=POPPLER_PATH
+            )
+        annotate(pages=len(images), ocr=True)
+
+        if roi:
+            from backend.roi_ocr import roi_ocr
+
+            # Header / closing blocks first, more only if fields are missing
+            roi_text, tier = roi_ocr(images, _tesseract)
+            count("ocr_roi_total", tier=tier)
+            annotate(roi_tier=tier)
+            text += roi_text + "\n"
+        else:
+            for page_no, img in enumerate(images):
+                page_text = ocr_image(img, page_no)
+                if page_text:
+                    text += page_text + "\n"
 
     return text.strip()
-def detect_report_type(text: str) -> str:
-    t = text.lower()
-
-    radiology_keywords = [
-        "ct scan", "x-ray", "mri",
-        "ultrasound", "radiology", "imaging"
-    ]
-
-    for k in radiology_keywords:
-        if k in t:
-            return "radiology"
-
-    return "diagnosis"
+def ocr_image(img: "Image.Image", page_no: int = 0) -> str:
+    from backend.ocr_preprocess import prepare_page
+
+    # Grayscale, binarise, deskew, crop: Tesseract gets a small 1-bit page
+    with span("ocr.preprocess", page=page_no):
+        prepared = prepare_page(img)
+
+    if prepared.image is None:
+        count("ocr_blank_pages_total")
+        return ""
+
+    return _tesseract(prepared.image, page_no)
+def _tesseract(image: "Image.Image", page_no: int = 0) -> str:
+    from backend.ocr_cache import cached_ocr
+
+    # Pages (or regions) seen before come from the page cache
+    return cached_ocr(image, lambda im: _run_tesseract(im, page_no))
+def _run_tesseract(image: "Image.Image", page_no: int = 0) -> str:
+    with span("ocr.page", page=page_no, pixels=image.width * image.height):
+        text = _pytesseract().image_to_string(image)
+    count("ocr_pages_total")
+    count("ocr_pixels_total", image.width * image.height)
+
+    return text
+def load_image(image_bytes: bytes) -> "Image.Image":
+    from PIL import Image, ImageOps
+
+    img = Image.open(BytesIO(image_bytes))
+
+    pixels = img.width * img.height
+    if pixels > MAX_OCR_PIXELS:
+        # JPEG draft mode: decode at 1/2, 1/4 or 1/8 scale, in grayscale
+        scale = (MAX_OCR_PIXELS / pixels) ** 0.5
+        img.draft("L", (int(img.width * scale), int(img.height * scale)))
+
+    # Phone photos: apply the EXIF rotation before OCR
+    img = ImageOps.exif_transpose(img)
+
+    if img.width * img.height > MAX_OCR_PIXELS:
+        scale = (MAX_OCR_PIXELS / (img.width * img.height)) ** 0.5
+        img.thumbnail((int(img.width * scale), int(img.height * scale)), Image.BOX)
+
+    return img
+def extract_text_from_image(image_bytes: bytes, roi: bool = False) -> str:
+    # Already a raster: straight to OCR, no pdf2image round trip
+    annotate(pages=1, ocr=True)
+    with span("image.load"):
+        img = load_image(image_bytes)
+
+    if roi:
+        from backend.roi_ocr import roi_ocr
+
+        text, tier = roi_ocr([img], _tesseract)
+        count("ocr_roi_total", tier=tier)
+        return text.strip()
+
+    return ocr_image(img).strip()
+def _docx_lines(container) -> List[str]:
+    from docx.table import Table
+
+    lines = []
+    for block in container.iter_inner_content():
+        if isinstance(block, Table):
+            for row in block.rows:
+                # Merged cells repeat their text: keep each once
+                cells = dict.fromkeys(c.text.strip() for c in row.cells)
+                lines.append("\t".join(c for c in cells if c))
+        else:
+            lines.append(block.text)
+    return lines
+def extract_text_from_docx(docx_bytes: bytes) -> str:
+    # Typed reports: text straight from the document XML, no rendering / OCR
+    from docx import Document
+
+    with span("docx.read"):
+        document = Document(BytesIO(docx_bytes))
+
+        # Letterheads / patient banners often live in the page header
+        header = []
+        for section in document.sections:
+            header += _docx_lines(section.header)
+
+        lines = list(dict.fromkeys(line for line in header if line.strip()))
+        lines += _docx_lines(document)
+
+    return "\n".join(lines).strip()
 def extract_patient_name(text: str) -> str:
-    t = text.replace("\n", " ")
-
-    match = re.search(
-        r"(Patient Name|Patient|Name)\s*[:\-]?\s*([A-Z][a-z]+(?:\s[A-Z][a-z]+){1,2})",
-        t
-    )
-
-    if match:
-        name = match.group(2).strip()
-
-        # Remove trailing junk words
-        junk = ["patient", "age", "sex", "gender"]
-        if not any(j in name.lower() for j in junk):
-            return name
-
-    return "Not mentioned"
+    return patient_name(scan_fields(text, ("name",)))
 def extract_age(text: str) -> str:
-    match = re.search(r"(Age)\s*[:\-]?\s*(\d{1,3})", text, re.I)
-    return match.group(2) if match else "Not mentioned"
+    return patient_age(scan_fields(text, ("age",)))
 def extract_gender(text: str) -> str:
-    match = re.search(
-        r"(Gender|Sex)\s*[:\-]?\s*(Male|Female|M|F)",
-        text,
-        re.I
-    )
-
-    if match:
-        g = match.group(2).upper()
-        return "Male" if g in ["M", "MALE"] else "Female"
-
-    return "Not mentioned"
-def extract_diagnosis(text: str) -> str:
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    diagnosis = "Diagnosis not clearly specified"
-
-    for i, line in enumerate(lines):
-        if any(k in line.lower() for k in [
-            "final diagnosis", "impression",
-            "diagnosis", "conclusion"
-        ]):
-            if i + 1 < len(lines):
-                candidate = lines[i + 1]
-
-                stop_words = [
-                    "section", "lab", "patient",
-                    "page", "date", "signed",
-                    "imaging", "investigation"
-                ]
-
-                if (
-                    len(candidate) < 100 and
-                    not any(sw in candidate.lower() for sw in stop_words)
-                ):
-                    diagnosis = candidate
-                    break
-
-    # Normalize normal findings
-    if diagnosis.lower().startswith("normal"):
-        diagnosis = "No abnormal findings detected"
-
-    return diagnosis
-def extract_chief_complaint(text: str) -> str:
-    match = re.search(
-        r"(Chief Complaint|Presenting Complaint|Reason for Admission)[:\-]?\s*(.+)",
-        text,
-        re.I
-    )
-
-    return match.group(2).strip() if match else "Not mentioned"
-def process_diagnosis_report(pdf_bytes: bytes) -> Dict:
-    text = extract_text_from_pdf(pdf_bytes)
-    report_type = detect_report_type(text)
-
-    patient_details = {
-        "name": extract_patient_name(text),
-        "age": extract_age(text),
-        "gender": extract_gender(text)
-    }
+    return patient_gender(scan_fields(text, ("gender",)))
+def extract_layout(pdf_bytes: bytes) -> Optional["DocumentLayout"]:
+    """
+    Positional word layout for digital PDFs; None for scans / non-PDFs.
+    """
+    from backend.layout import load_layout
 
-    diagnosis = extract_diagnosis(text)
-    chief_complaint = extract_chief_complaint(text)
+    try:
+        with span("pdf.layout"):
+            layout = load_layout(pdf_bytes)
+    except Exception:
+        return None
 
-    # Radiology fallback
-    if report_type == "radiology" and diagnosis == "Diagnosis not clearly specified":
-        diagnosis = "No acute cardiopulmonary process identified"
+    # Same threshold as the OCR fallback
+    if len(layout.text.strip()) < 200:
+        return None
+
+    return layout
+def _describe_report(result: Dict, pdf_bytes: bytes, *args, **kwargs) -> Dict:
+    return {
+        "bytes": len(pdf_bytes),
+        "report_type": result["summary_data"].get("report_type"),
+        "text_chars": len(result["raw_text"])
+    }
+@profiled("process_diagnosis_report", describe=_describe_report)
+def process_diagnosis_report(pdf_bytes: bytes, layout: bool = False, roi: bool = False) -> Dict:
+    # Raises PreflightError before any parsing / OCR
+    checked = preflight(pdf_bytes)
+    count("preflight_total", kind=checked.kind, decision=checked.decision)
+
+    # Heavy scans wait for a free slot instead of competing for CPU
+    with heavy_slot() if checked.decision == QUEUE else nullcontext():
+        if checked.kind in IMAGE_KINDS:
+            doc_layout = None
+            text = extract_text_from_image(pdf_bytes, roi)
+        elif checked.kind == "docx":
+            doc_layout = None
+            annotate(pages=checked.pages)
+            text = extract_text_from_docx(pdf_bytes)
+        else:
+            doc_layout = extract_layout(pdf_bytes) if layout else None
+            text = None
+
+        if doc_layout is not None:
+            annotate(pages=doc_layout.rows[-1].page + 1 if doc_layout.rows else 0)
+            # Label/value pairs and lab tables read spatially
+            text = doc_layout.text
+            seed_hits = doc_layout.field_hits()
+        else:
+            if text is None:
+                text = extract_text_from_pdf(pdf_bytes, roi)
+            seed_hits = None
+
+    # Normalise once, scan once, run only the stages this type needs
+    with span("extract.fields"):
+        ctx = analyse_text(text, seed_hits=seed_hits)
 
     return {
-        "details": patient_details,
-        "summary_data": {
-            "final_diagnosis": diagnosis,
-            "chief_complaint": chief_complaint,
-            "report_type": report_type
-        },
+        "details": ctx.details,
+        "summary_data": ctx.summary,
         "raw_text": text
     }
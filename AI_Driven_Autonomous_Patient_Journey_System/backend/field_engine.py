@@ -0,0 +1,371 @@
+"""
+field_engine.py
+
+ROLE
+----
+Precompiled, single-pass field extraction engine.
+
+PURPOSE
+-------
+- Compile the labels of every report field (name, age, gender, diagnosis,
+  chief complaint, impression, lab analytes) into ONE keyword automaton
+- Find all label occurrences in a single left-to-right scan of the text
+- Parse a field's value only where one of its labels occurs
+
+NOTE
+----
+Labels are compiled into a trie-shaped regex, so the cost per character
+depends on label length, not on how many fields are registered.
+Adding a field does not add another pass over the report.
+"""
+
+import re
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple
+)
+
+# (text, label_start, label_end) -> value or None when the label is a false hit
+ValueParser = Callable[[str, int, int], Optional[str]]
+
+
+class FieldSpec(NamedTuple):
+    name: str
+    labels: Tuple[str, ...]
+    parse: ValueParser
+    case_sensitive: bool = False
+    # Label must not touch letters/digits on either side
+    whole_word: bool = False
+    # Accept hits lying inside a longer label (e.g. "cholesterol" in
+    # "HDL cholesterol")
+    nested: bool = True
+
+
+class FieldHit(NamedTuple):
+    start: int
+    value: str
+
+
+# -------------------------------------------------
+# KEYWORD AUTOMATON
+# -------------------------------------------------
+def build_keyword_pattern(keywords: Iterable[str]) -> str:
+    """
+    Build a trie-shaped regex alternation matching any of the keywords.
+    Shared prefixes are matched once and longer keywords win over their
+    own prefixes.
+    """
+    trie: Dict[str, dict] = {}
+
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    return _trie_to_regex(trie)
+
+
+def _trie_to_regex(node: Dict[str, dict]) -> str:
+    alternatives = [
+        re.escape(ch) + _trie_to_regex(child)
+        for ch, child in sorted(node.items())
+        if ch
+    ]
+
+    if not alternatives:
+        return ""
+
+    body = (
+        alternatives[0] if len(alternatives) == 1
+        else "(?:" + "|".join(alternatives) + ")"
+    )
+
+    return f"(?:{body})?" if "" in node else body
+
+
+# -------------------------------------------------
+# ENGINE
+# -------------------------------------------------
+class FieldEngine:
+    """
+    Compiled set of fields scanned together in one pass.
+    """
+
+    def __init__(self, specs: Sequence[FieldSpec]):
+        self.specs: Dict[str, FieldSpec] = {s.name: s for s in specs}
+
+        by_label: Dict[str, List[Tuple[str, str]]] = {}
+        for spec in specs:
+            for label in spec.labels:
+                by_label.setdefault(label.lower(), []).append(
+                    (spec.name, label)
+                )
+
+        # The automaton reports the longest label at each position; shorter
+        # labels that are its prefixes are tried next, like a regex
+        # alternation would backtrack.
+        self._candidates: Dict[str, List[Tuple[str, str]]] = {}
+        for key in by_label:
+            prefixes = sorted(
+                (k for k in by_label if key.startswith(k)),
+                key=len,
+                reverse=True
+            )
+            self._candidates[key] = [
+                entry for k in prefixes for entry in by_label[k]
+            ]
+
+        # Zero-width lookahead: overlapping labels are all visited
+        self._pattern = re.compile(
+            "(?=(" + build_keyword_pattern(by_label) + "))",
+            re.I
+        )
+
+    def scan(
+        self,
+        text: str,
+        fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, FieldHit]:
+        """
+        Return the first valid hit for each requested field.
+
+        Args:
+            text (str): Report text
+            fields (optional): Field names to resolve (default: all)
+
+        Returns:
+            Dict[str, FieldHit]: Resolved fields only
+        """
+
+        wanted = (
+            set(self.specs) if fields is None
+            else set(fields) & set(self.specs)
+        )
+        hits: Dict[str, FieldHit] = {}
+
+        if not wanted or not text:
+            return hits
+
+        shadow_end = 0
+
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            label_end = match.end(1)
+            nested = label_end <= shadow_end
+            shadow_end = max(shadow_end, label_end)
+
+            for field, label in self._candidates[match.group(1).lower()]:
+                if field not in wanted or field in hits:
+                    continue
+
+                spec = self.specs[field]
+                end = start + len(label)
+
+                if nested and not spec.nested:
+                    continue
+                if spec.case_sensitive and not text.startswith(label, start):
+                    continue
+                if spec.whole_word and not _is_whole_word(text, start, end):
+                    continue
+
+                value = spec.parse(text, start, end)
+                if value is not None:
+                    hits[field] = FieldHit(start, value)
+
+            if len(hits) == len(wanted):
+                break
+
+        return hits
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end].isalpha():
+        return False
+    return True
+
+
+# -------------------------------------------------
+# VALUE PARSERS
+# -------------------------------------------------
+def regex_value(pattern: str, flags: int = 0) -> ValueParser:
+    """
+    Value parser matching `pattern` right after the label (group 1).
+    """
+    compiled = re.compile(pattern, flags)
+
+    def parse(text: str, start: int, end: int) -> Optional[str]:
+        match = compiled.match(text, end)
+        return match.group(1) if match else None
+
+    return parse
+
+
+# Same line boundaries as str.splitlines()
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+_HEADING_VALUE = re.compile(r"[ \t]*[:\-]?[ \t]*(?![:\-])\S")
+
+_DIAGNOSIS_STOP_WORDS = (
+    "section", "lab", "patient",
+    "page", "date", "signed",
+    "imaging", "investigation"
+)
+
+
+def next_line_after(text: str, pos: int) -> Optional[str]:
+    """
+    First non-blank line after the line containing `pos`.
+    """
+    while True:
+        brk = _LINE_BREAK.search(text, pos)
+        if brk is None:
+            return None
+
+        nxt = _LINE_BREAK.search(text, brk.end())
+        line = text[brk.end():nxt.start() if nxt else len(text)].strip()
+
+        if line:
+            return line
+        if nxt is None:
+            return None
+
+        pos = nxt.start()
+
+
+def _diagnosis_next_line(text: str, start: int, end: int) -> Optional[str]:
+    # Only a bare heading: "Diagnosis: X" is the inline fields' value
+    if _HEADING_VALUE.match(text, end):
+        return None
+
+    candidate = next_line_after(text, end)
+
+    if candidate is None or len(candidate) >= 100:
+        return None
+
+    lowered = candidate.lower()
+    if any(sw in lowered for sw in _DIAGNOSIS_STOP_WORDS):
+        return None
+
+    return candidate
+
+
+_INLINE_HEAD = re.compile(r"[:\-]?\s*")
+
+
+def _first_line_value(text: str, start: int, end: int) -> Optional[str]:
+    """
+    First line of `[:\-]?\s*(.+)` matched with re.S, without capturing the
+    rest of the document.
+    """
+    pos = _INLINE_HEAD.match(text, end).end()
+
+    if pos < len(text):
+        eol = text.find("\n", pos)
+        return text[pos:eol if eol != -1 else len(text)]
+
+    # End of text: the regex would backtrack one character
+    return text[-1] if pos > end else None
+
+
+# -------------------------------------------------
+# DEFAULT FIELDS
+# -------------------------------------------------
+_INLINE_VALUE = r"[:\-]?\s*(.+)"
+# Inline value on the label's own line (never the next line)
+_SAME_LINE_VALUE = r"[ \t]*[:\-]?[ \t]*(?![:\-])(\S.*)"
+
+BASE_FIELDS: Tuple[FieldSpec, ...] = (
+    # Demographics
+    FieldSpec(
+        "name",
+        ("Patient Name", "Patient", "Name"),
+        regex_value(r"\s*[:\-]?\s*([A-Z][a-z]+(?:\s[A-Z][a-z]+){1,2})"),
+        case_sensitive=True
+    ),
+    FieldSpec("age", ("age",), regex_value(r"\s*[:\-]?\s*(\d{1,3})")),
+    FieldSpec(
+        "gender",
+        ("gender", "sex"),
+        regex_value(r"\s*[:\-]?\s*(Male|Female|M|F)", re.I)
+    ),
+
+    # Identifiers (journey linking): hospital record number, birth date.
+    # No "reg no" (also the doctor's registration in the signature) and
+    # no "ip no" (one per admission, not per patient)
+    FieldSpec(
+        "patient_id",
+        ("mrn", "uhid", "patient id", "hospital no"),
+        regex_value(r"\.?\s*(?:no\.?|number)?\s*[:\-#]?\s*([A-Z0-9][A-Z0-9/\-]{3,})", re.I),
+        whole_word=True
+    ),
+    FieldSpec(
+        "dob",
+        ("date of birth", "dob", "d.o.b"),
+        regex_value(
+            r"\.?\s*[:\-]?\s*(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{4}-\d{2}-\d{2}"
+            r"|\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4})"
+        ),
+        whole_word=True
+    ),
+
+    # Diagnosis: value on the line after a heading ...
+    FieldSpec(
+        "diagnosis",
+        ("final diagnosis", "impression", "diagnosis", "conclusion"),
+        _diagnosis_next_line
+    ),
+    # ... or inline after the label
+    FieldSpec("final_diagnosis", ("final diagnosis",), regex_value(_SAME_LINE_VALUE)),
+    FieldSpec("diagnosis_inline", ("diagnosis",), regex_value(_SAME_LINE_VALUE)),
+    FieldSpec("impression_inline", ("impression",), regex_value(_SAME_LINE_VALUE)),
+
+    # Radiology impression block
+    FieldSpec(
+        "impression",
+        ("impression", "conclusion"),
+        _first_line_value
+    ),
+
+    # Complaint
+    FieldSpec(
+        "chief_complaint",
+        ("chief complaint", "presenting complaint"),
+        regex_value(_INLINE_VALUE)
+    ),
+    FieldSpec("admission_reason", ("reason for admission",), regex_value(_INLINE_VALUE)),
+)
+
+_ENGINE: Optional[FieldEngine] = None
+
+
+def default_engine() -> FieldEngine:
+    """
+    Engine over the base fields plus every analyte in the lab catalogue.
+    Compiled on first use.
+    """
+    global _ENGINE
+
+    if _ENGINE is None:
+        from backend.labs import lab_field_specs
+        _ENGINE = FieldEngine(BASE_FIELDS + lab_field_specs())
+
+    return _ENGINE
+
+
+def scan_fields(
+    text: str,
+    fields: Optional[Iterable[str]] = None
+) -> Dict[str, FieldHit]:
+    """
+    Scan `text` once with the default engine.
+    """
+    return default_engine().scan(text, fields)
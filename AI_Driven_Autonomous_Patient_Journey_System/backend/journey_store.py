@@ -0,0 +1,422 @@
+"""
+journey_store.py
+
+ROLE
+----
+Longitudinal patient journey store (embedded SQLite, WAL mode).
+
+PURPOSE
+-------
+- Persist every analysed upload: patient, report, extraction and plan
+- Indexed lookups by patient identity, report date and diagnosis, so a
+  patient's history is one indexed query with no reprocessing of old
+  documents
+- Bulk-insert API (executemany in one transaction) for imports and
+  backfills
+
+NOTE
+----
+Patient identity needs a real identifier: the hospital record number
+(MRN / UHID / patient id) when the report has one, else name + date of
+birth. Name + gender alone is NOT identity (two "Ravi Kumar, Male"
+patients would share a history), so reports without an identifier are
+stored unlinked (patient_id NULL) and never shown as anyone's journey.
+
+report_date is when the report was analysed (upload time) unless the
+caller passes the document's own date.
+
+Environment:
+    JOURNEY_DB_PATH=...      SQLite file (default <STATE_DIR>/journey.sqlite)
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from backend.settings import STATE_DIR
+from backend.telemetry import count
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(os.getenv("JOURNEY_DB_PATH", STATE_DIR / "journey.sqlite"))
+
+# Extracted values that do not identify anyone
+_UNKNOWN = {"", "not mentioned", "unknown", "n/a", "na"}
+
+# Bulk inserts are split into transactions of this many reports
+BULK_CHUNK = 500
+
+_DOB_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d",
+    "%d/%m/%y", "%d-%m-%y", "%d.%m.%y",
+    "%d %B %Y", "%d %b %Y"
+)
+
+
+class JourneyRecord(NamedTuple):
+    upload_key: str
+    kind: str                    # preflight kind: "pdf", "docx", "png", ...
+    extraction: Dict[str, Any]   # process_diagnosis_report result
+    plan: Dict[str, Any]         # generate_full_care_plan result
+    report_date: Optional[float] = None   # epoch seconds; default: now (upload time)
+
+
+class HistoryEntry(NamedTuple):
+    report_id: int
+    upload_key: str
+    report_date: float           # upload time unless recorded otherwise
+    report_type: str
+    diagnosis: str
+    plan: Optional[Dict[str, Any]]
+
+
+# =====================================================
+# IDENTITY
+# =====================================================
+def _known(value: Any) -> str:
+    value = re.sub(r"\s+", " ", str(value or "")).strip()
+    return "" if value.lower() in _UNKNOWN else value
+
+
+def _dob(value: str) -> str:
+    # One spelling per date: "12/04/1966" and "12-04-1966" are the same
+    for fmt in _DOB_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value.lower()
+
+
+def identity_key(details: Dict[str, Any]) -> Optional[str]:
+    """
+    "id:<record number>", else "dob:<date of birth>|<name>", else None
+    (no identifier: the report stays unlinked).
+    """
+    record_no = re.sub(r"[^A-Z0-9]", "", _known(details.get("patient_id")).upper())
+    if record_no:
+        return f"id:{record_no}"
+
+    name = _known(details.get("name")).lower()
+    dob = _known(details.get("dob"))
+    if name and dob:
+        return f"dob:{_dob(dob)}|{name}"
+
+    return None
+
+
+# =====================================================
+# STORE
+# =====================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    identity_key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    age TEXT NOT NULL,          -- at the first report; per-report age is in extractions
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    patient_id INTEGER REFERENCES patients (id),
+    upload_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    diagnosis TEXT NOT NULL,
+    report_date REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extractions (
+    report_id INTEGER PRIMARY KEY REFERENCES reports (id) ON DELETE CASCADE,
+    details TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    raw_text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    created REAL NOT NULL,
+    plan TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS patients_name ON patients (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS reports_patient_date ON reports (patient_id, report_date);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (report_date);
+CREATE INDEX IF NOT EXISTS reports_diagnosis ON reports (diagnosis COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS plans_report ON plans (report_id, created);
+"""
+
+_UPSERT_PATIENT = """
+INSERT INTO patients (identity_key, name, gender, age, created, updated)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (identity_key) DO UPDATE SET
+    updated = excluded.updated
+"""
+
+_UPSERT_REPORT = """
+INSERT INTO reports (patient_id, upload_key, kind, report_type, diagnosis, report_date)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (upload_key) DO UPDATE SET
+    patient_id = excluded.patient_id,
+    report_type = excluded.report_type,
+    diagnosis = excluded.diagnosis
+"""
+
+_UPSERT_EXTRACTION = """
+INSERT INTO extractions (report_id, details, summary, raw_text)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (report_id) DO UPDATE SET
+    details = excluded.details,
+    summary = excluded.summary,
+    raw_text = excluded.raw_text
+"""
+
+# Latest plan per report in the same query as the reports
+_HISTORY = """
+SELECT r.id, r.upload_key, r.report_date, r.report_type, r.diagnosis,
+       (SELECT p.plan FROM plans p WHERE p.report_id = r.id
+        ORDER BY p.created DESC LIMIT 1)
+FROM reports r
+WHERE r.patient_id = ?
+ORDER BY r.report_date DESC
+LIMIT ?
+"""
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+class JourneyStore:
+    """
+    Embedded patient journey database; one connection per thread.
+    """
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------------------------
+    # WRITES
+    # -------------------------------------------------
+    def record(self, record: JourneyRecord) -> int:
+        """
+        Store one analysed upload; returns the report id.
+        """
+        return self.record_many([record])[record.upload_key]
+
+    def record_many(self, records: Iterable[JourneyRecord]) -> Dict[str, int]:
+        """
+        Bulk insert (executemany, one transaction per BULK_CHUNK).
+
+        Returns:
+            Dict[str, int]: upload_key -> report id
+        """
+        ids: Dict[str, int] = {}
+        chunk: List[JourneyRecord] = []
+
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= BULK_CHUNK:
+                ids.update(self._insert(chunk))
+                chunk = []
+        if chunk:
+            ids.update(self._insert(chunk))
+
+        return ids
+
+    def _insert(self, records: List[JourneyRecord]) -> Dict[str, int]:
+        now = time.time()
+        conn = self._conn()
+
+        details = [r.extraction.get("details") or {} for r in records]
+        keys = [identity_key(d) for d in details]
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            conn.executemany(_UPSERT_PATIENT, [
+                (key, _known(d.get("name")), _known(d.get("gender")), _known(d.get("age")), now, now)
+                for key, d in zip(keys, details) if key is not None
+            ])
+            patient_ids = self._ids(conn, "patients", "identity_key", {k for k in keys if k})
+
+            conn.executemany(_UPSERT_REPORT, [
+                (
+                    patient_ids.get(key),
+                    r.upload_key,
+                    r.kind,
+                    str((r.extraction.get("summary_data") or {}).get("report_type", "")),
+                    str(r.plan.get("identified_problem")
+                        or (r.extraction.get("summary_data") or {}).get("final_diagnosis", "")),
+                    r.report_date if r.report_date is not None else now
+                )
+                for key, r in zip(keys, records)
+            ])
+            report_ids = self._ids(conn, "reports", "upload_key", {r.upload_key for r in records})
+
+            conn.executemany(_UPSERT_EXTRACTION, [
+                (
+                    report_ids[r.upload_key],
+                    _json(r.extraction.get("details") or {}),
+                    _json(r.extraction.get("summary_data") or {}),
+                    r.extraction.get("raw_text") or ""
+                )
+                for r in records
+            ])
+            conn.executemany(
+                "INSERT INTO plans (report_id, created, plan) VALUES (?, ?, ?)",
+                [(report_ids[r.upload_key], now, _json(r.plan)) for r in records if r.plan]
+            )
+
+        return report_ids
+
+    @staticmethod
+    def _ids(conn: sqlite3.Connection, table: str, column: str, values: set) -> Dict[str, int]:
+        ids: Dict[str, int] = {}
+        values = list(values)
+
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(values), 900):
+            part = values[start:start + 900]
+            rows = conn.execute(
+                f"SELECT {column}, id FROM {table} WHERE {column} IN ({','.join('?' * len(part))})",
+                part
+            )
+            ids.update(rows)
+
+        return ids
+
+    # -------------------------------------------------
+    # READS
+    # -------------------------------------------------
+    def patient_id(self, details: Dict[str, Any]) -> Optional[int]:
+        key = identity_key(details)
+        if key is None:
+            return None
+
+        row = self._conn().execute(
+            "SELECT id FROM patients WHERE identity_key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def history(self, patient_id: int, limit: int = 50) -> List[HistoryEntry]:
+        """
+        A patient's reports, newest first, with their latest plans.
+        """
+        rows = self._conn().execute(_HISTORY, (patient_id, limit)).fetchall()
+        return [
+            HistoryEntry(
+                report_id=row[0],
+                upload_key=row[1],
+                report_date=row[2],
+                report_type=row[3],
+                diagnosis=row[4],
+                plan=json.loads(row[5]) if row[5] else None
+            )
+            for row in rows
+        ]
+
+    def history_for(self, details: Dict[str, Any], limit: int = 50) -> List[HistoryEntry]:
+        patient_id = self.patient_id(details)
+        return [] if patient_id is None else self.history(patient_id, limit)
+
+    def find_patients(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Patients whose name starts with `name` (case-insensitive).
+        """
+        rows = self._conn().execute(
+            "SELECT id, name, gender, age, updated FROM patients "
+            "WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE "
+            "ORDER BY name COLLATE NOCASE LIMIT ?",
+            (name, name + "\uffff", limit)
+        )
+        return [
+            {"id": r[0], "name": r[1], "gender": r[2], "age": r[3], "updated": r[4]}
+            for r in rows
+        ]
+
+    def reports_with_diagnosis(self, diagnosis: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Reports whose diagnosis starts with `diagnosis` (case-insensitive).
+        """
+        rows = self._conn().execute(
+            "SELECT id, patient_id, report_date, report_type, diagnosis FROM reports "
+            "WHERE diagnosis >= ? COLLATE NOCASE AND diagnosis < ? COLLATE NOCASE "
+            "ORDER BY report_date DESC LIMIT ?",
+            (diagnosis, diagnosis + "\uffff", limit)
+        )
+        return [
+            {"id": r[0], "patient_id": r[1], "report_date": r[2], "report_type": r[3], "diagnosis": r[4]}
+            for r in rows
+        ]
+
+    def reports_between(self, start: float, end: float, limit: int = 500) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT id, patient_id, report_date, report_type, diagnosis FROM reports "
+            "WHERE report_date >= ? AND report_date < ? ORDER BY report_date LIMIT ?",
+            (start, end, limit)
+        )
+        return [
+            {"id": r[0], "patient_id": r[1], "report_date": r[2], "report_type": r[3], "diagnosis": r[4]}
+            for r in rows
+        ]
+
+
+_STORE: Optional[JourneyStore] = None
+
+
+def get_store() -> JourneyStore:
+    global _STORE
+
+    if _STORE is None:
+        _STORE = JourneyStore()
+    return _STORE
+
+
+# =====================================================
+# PIPELINE HOOKS
+# =====================================================
+def record_upload(record: JourneyRecord) -> Optional[int]:
+    """
+    Store an analysed upload; None when the store is unavailable.
+    """
+    try:
+        return get_store().record(record)
+    except sqlite3.Error as e:
+        logger.warning("Journey store write failed: %s", e)
+        count("journey_errors_total", op="record")
+        return None
+
+
+def patient_history(details: Dict[str, Any], exclude: Optional[str] = None) -> List[HistoryEntry]:
+    """
+    Earlier reports of this patient (not `exclude`); empty on errors.
+    """
+    try:
+        history = get_store().history_for(details)
+    except sqlite3.Error as e:
+        logger.warning("Journey store read failed: %s", e)
+        count("journey_errors_total", op="history")
+        return []
+
+    return [entry for entry in history if entry.upload_key != exclude]
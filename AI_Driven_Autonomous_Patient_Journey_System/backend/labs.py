@@ -0,0 +1,289 @@
+"""
+labs.py
+
+ROLE
+----
+Data-driven lab value extraction.
+
+PURPOSE
+-------
+- Load the analyte catalogue (synonyms, canonical unit, reference range,
+  unit conversions) from data/lab_catalogue.csv
+- Register every synonym with the single-pass field engine, so a large
+  catalogue costs one scan per report
+- Return results as a typed columnar LabPanel, unit-converted and flagged
+  in bulk with NumPy
+
+NOTE
+----
+alt_units entries are "unit=factor" pairs, separated by "|":
+canonical_value = value * factor
+
+A value without a unit is taken to be in the canonical unit. A unit the
+catalogue does not know is NEVER assumed canonical: the value and unit
+are kept as reported and the row is left unflagged.
+"""
+
+import csv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.field_engine import FieldHit, FieldSpec, scan_fields
+
+CATALOGUE_PATH = Path(__file__).resolve().parent.parent / "data" / "lab_catalogue.csv"
+
+FLAG_LOW = -1
+FLAG_NORMAL = 0
+FLAG_HIGH = 1
+# Unrecognised unit: not compared with the reference range
+FLAG_UNKNOWN = 2
+
+_FLAG_LABELS = {FLAG_LOW: "Low", FLAG_NORMAL: "Normal", FLAG_HIGH: "High", FLAG_UNKNOWN: ""}
+
+
+# =====================================================
+# CATALOGUE
+# =====================================================
+@dataclass(frozen=True)
+class LabCatalogue:
+    ids: Tuple[str, ...]
+    names: Tuple[str, ...]
+    synonyms: Tuple[Tuple[str, ...], ...]
+    units: np.ndarray          # canonical unit per analyte
+    ref_low: np.ndarray        # float64, NaN = no bound
+    ref_high: np.ndarray       # float64, NaN = no bound
+    conversions: Dict[Tuple[int, str], float]
+    positions: Dict[str, int]
+
+
+def _unit_key(unit: str) -> str:
+    """
+    Normalise a unit spelling for lookup (case, micro sign, spacing).
+    """
+    key = unit.strip().rstrip(".:").lower().replace(" ", "")
+    key = key.replace("µ", "u").replace("μ", "u").replace("mcg", "ug")
+    key = key.replace("×", "x").replace("cu.mm", "cumm").replace("mm3", "ul")
+
+    if key.startswith("x10"):
+        key = key[1:]
+
+    return key
+
+
+def _bound(value: str) -> float:
+    return float(value) if value.strip() else np.nan
+
+
+def load_catalogue(path: Path = CATALOGUE_PATH) -> LabCatalogue:
+    """
+    Load and validate the analyte catalogue.
+
+    Raises:
+        ValueError: If a synonym is claimed by two analytes or a
+            conversion entry is malformed
+    """
+
+    ids, names, synonyms, units, lows, highs = [], [], [], [], [], []
+    conversions: Dict[Tuple[int, str], float] = {}
+    owner: Dict[str, str] = {}
+
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            idx = len(ids)
+            analyte_id = row["analyte_id"].strip()
+
+            labels = tuple(
+                s.strip().lower() for s in row["synonyms"].split("|") if s.strip()
+            )
+            for label in labels:
+                if label in owner:
+                    raise ValueError(
+                        f"Lab synonym '{label}' used by both "
+                        f"{owner[label]} and {analyte_id}"
+                    )
+                owner[label] = analyte_id
+
+            ids.append(analyte_id)
+            names.append(row["name"].strip())
+            synonyms.append(labels)
+            units.append(row["unit"].strip())
+            lows.append(_bound(row["ref_low"]))
+            highs.append(_bound(row["ref_high"]))
+
+            conversions[(idx, _unit_key(row["unit"]))] = 1.0
+            for entry in filter(None, (row["alt_units"] or "").split("|")):
+                unit, sep, factor = entry.rpartition("=")
+                if not sep:
+                    raise ValueError(
+                        f"Bad alt_units entry '{entry}' for {analyte_id}"
+                    )
+                conversions[(idx, _unit_key(unit))] = float(factor)
+
+    return LabCatalogue(
+        ids=tuple(ids),
+        names=tuple(names),
+        synonyms=tuple(synonyms),
+        units=np.array(units, dtype=object),
+        ref_low=np.array(lows, dtype=np.float64),
+        ref_high=np.array(highs, dtype=np.float64),
+        conversions=conversions,
+        positions={a: i for i, a in enumerate(ids)}
+    )
+
+
+_CATALOGUE: Optional[LabCatalogue] = None
+
+
+def get_catalogue() -> LabCatalogue:
+    global _CATALOGUE
+
+    if _CATALOGUE is None:
+        _CATALOGUE = load_catalogue()
+
+    return _CATALOGUE
+
+
+# =====================================================
+# FIELD ENGINE REGISTRATION
+# =====================================================
+FIELD_PREFIX = "lab:"
+
+_LAB_VALUE = re.compile(
+    r"\s*[:\-=]?\s*"
+    r"(\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+    r"(?:[ \t]*((?:[xX×][ \t]?)?(?:10\^\d+)?[a-zA-Zµμ%/][^\s,;()\[\]]*))?"
+)
+
+
+def _parse_lab_value(text: str, start: int, end: int) -> Optional[str]:
+    match = _LAB_VALUE.match(text, end)
+    if not match:
+        return None
+
+    # "value unit" -- split again when the panel is built
+    return f"{match.group(1).replace(',', '')} {match.group(2) or ''}".rstrip()
+
+
+def lab_field_specs() -> Tuple[FieldSpec, ...]:
+    catalogue = get_catalogue()
+
+    return tuple(
+        FieldSpec(
+            FIELD_PREFIX + analyte_id,
+            labels,
+            _parse_lab_value,
+            whole_word=True,
+            nested=False
+        )
+        for analyte_id, labels in zip(catalogue.ids, catalogue.synonyms)
+    )
+
+
+def lab_fields() -> Tuple[str, ...]:
+    return tuple(FIELD_PREFIX + a for a in get_catalogue().ids)
+
+
+# =====================================================
+# COLUMNAR RESULT
+# =====================================================
+@dataclass(frozen=True)
+class LabPanel:
+    """
+    One row per analyte found, in report order.
+    Values are in the analyte's canonical catalogue unit, except rows
+    with an unrecognised unit (reported value and unit, FLAG_UNKNOWN).
+    """
+    analyte: np.ndarray        # int32 index into the catalogue
+    value: np.ndarray          # float64
+    unit: np.ndarray           # unit strings (object)
+    flag: np.ndarray           # int8: FLAG_LOW / FLAG_NORMAL / FLAG_HIGH / FLAG_UNKNOWN
+
+    def __len__(self) -> int:
+        return len(self.analyte)
+
+    @property
+    def analyte_ids(self) -> List[str]:
+        ids = get_catalogue().ids
+        return [ids[i] for i in self.analyte]
+
+    def to_records(self) -> List[Dict]:
+        catalogue = get_catalogue()
+
+        return [
+            {
+                "analyte_id": catalogue.ids[a],
+                "name": catalogue.names[a],
+                "value": float(v),
+                "unit": u,
+                "flag": _FLAG_LABELS[int(f)]
+            }
+            for a, v, u, f in zip(self.analyte, self.value, self.unit, self.flag)
+        ]
+
+    def as_findings(self) -> List[str]:
+        names = get_catalogue().names
+
+        return [
+            f"{names[a]}: {v:g} {u}"
+            for a, v, u in zip(self.analyte, self.value, self.unit)
+        ]
+
+
+def build_lab_panel(hits: Dict[str, FieldHit]) -> LabPanel:
+    """
+    Convert lab hits from a field-engine scan into a LabPanel.
+    """
+    catalogue = get_catalogue()
+
+    lab_hits = sorted(
+        (hit.start, field[len(FIELD_PREFIX):], hit.value)
+        for field, hit in hits.items()
+        if field.startswith(FIELD_PREFIX)
+    )
+
+    analyte = np.empty(len(lab_hits), dtype=np.int32)
+    raw = np.empty(len(lab_hits), dtype=np.float64)
+    factor = np.ones(len(lab_hits), dtype=np.float64)
+    known = np.ones(len(lab_hits), dtype=bool)
+    units = np.empty(len(lab_hits), dtype=object)
+
+    for row, (_, analyte_id, value) in enumerate(lab_hits):
+        idx = catalogue.positions[analyte_id]
+        number, _, unit = value.partition(" ")
+
+        analyte[row] = idx
+        raw[row] = float(number)
+        units[row] = catalogue.units[idx]
+
+        # Missing unit: the canonical one. Unknown unit: keep as reported
+        if unit:
+            conversion = catalogue.conversions.get((idx, _unit_key(unit)))
+            if conversion is None:
+                known[row] = False
+                units[row] = unit
+            else:
+                factor[row] = conversion
+
+    value = raw * factor
+    low = catalogue.ref_low[analyte]
+    high = catalogue.ref_high[analyte]
+
+    flag = np.full(len(lab_hits), FLAG_NORMAL, dtype=np.int8)
+    flag[known & (value < low)] = FLAG_LOW
+    flag[known & (value > high)] = FLAG_HIGH
+    flag[~known] = FLAG_UNKNOWN
+
+    return LabPanel(
+        analyte=analyte,
+        value=value,
+        unit=units,
+        flag=flag
+    )
+
+
+def extract_lab_panel(text: str) -> LabPanel:
+    return build_lab_panel(scan_fields(text, lab_fields()))
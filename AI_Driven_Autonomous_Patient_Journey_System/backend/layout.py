@@ -0,0 +1,374 @@
+"""
+layout.py
+
+ROLE
+----
+Layout-aware extraction for digital PDFs (pdfplumber word coordinates).
+
+PURPOSE
+-------
+- Extract every word with its coordinates ONCE per document
+- Group words into rows and find label/value pairs spatially
+  ("Age" -> the value to its right, or in the block just below)
+- Read lab tables row by row: one dictionary lookup per row instead of a
+  regex per analyte
+- Cache the layout per document so repeat lookups are free
+
+NOTE
+----
+Results are returned as field-engine hits so the pipeline can use them
+in place of the plain-text scan for the same fields. A hit's `start` is
+the character offset of its label (or lab row) in DocumentLayout.text,
+the text the pipeline scans, so layout and text hits order together.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pdfplumber
+
+from backend.field_engine import FieldHit
+from backend.labs import FIELD_PREFIX, get_catalogue
+from backend.telemetry import count
+
+# Words whose tops differ by less than this (pt) share a row
+ROW_TOLERANCE = 3.0
+# Horizontal gap (pt) that ends a value: the next column starts there
+COLUMN_GAP = 40.0
+
+_CACHE_SIZE = 32
+
+
+class Word(NamedTuple):
+    text: str
+    x0: float
+    x1: float
+    top: float
+
+
+class Row(NamedTuple):
+    page: int
+    words: Tuple[Word, ...]
+
+    @property
+    def text(self) -> str:
+        return " ".join(w.text for w in self.words)
+
+
+# label (lowercase, no trailing colon) -> field
+LABELS: Dict[str, str] = {
+    "patient name": "name",
+    "patient's name": "name",
+    "name": "name",
+    "age": "age",
+    "age/sex": "age_sex",
+    "age / sex": "age_sex",
+    "age/gender": "age_sex",
+    "gender": "gender",
+    "sex": "gender",
+    "final diagnosis": "diagnosis",
+    "diagnosis": "diagnosis",
+    "impression": "diagnosis",
+    "conclusion": "diagnosis",
+    "chief complaint": "chief_complaint",
+    "presenting complaint": "chief_complaint",
+    "reason for admission": "chief_complaint",
+}
+
+_MAX_LABEL_WORDS = max(len(label.split()) for label in LABELS)
+
+_NUMBER = re.compile(r"^(\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)$")
+_AGE = re.compile(r"(\d{1,3})")
+_GENDER = re.compile(r"\b(male|female|m|f)\b", re.I)
+
+
+def _clean(token: str) -> str:
+    return token.lower().rstrip(":-").strip()
+
+
+def _has_colon(words: Tuple[Word, ...], end: int) -> bool:
+    if words[end - 1].text.endswith(":"):
+        return True
+    return end < len(words) and words[end].text.startswith(":")
+
+
+# =====================================================
+# DOCUMENT LAYOUT
+# =====================================================
+class DocumentLayout:
+    """
+    Rows of positioned words for a whole PDF, with memoised lookups.
+    """
+
+    def __init__(self, rows: List[Row]):
+        self.rows = rows
+        self._pairs: Optional[Dict[str, FieldHit]] = None
+        self._labs: Optional[Dict[str, FieldHit]] = None
+        self._text: Optional[Tuple[str, List[int]]] = None
+
+    def _text_index(self) -> Tuple[str, List[int]]:
+        # Document text (one line per row) and each row's start, built once
+        if self._text is None:
+            lines = [row.text for row in self.rows]
+            starts, pos = [], 0
+            for line in lines:
+                starts.append(pos)
+                pos += len(line) + 1
+            self._text = ("\n".join(lines), starts)
+        return self._text
+
+    @property
+    def text(self) -> str:
+        return self._text_index()[0]
+
+    def offset(self, r: int, i: int = 0) -> int:
+        """
+        Character offset in `text` of word `i` of row `r`.
+        """
+        start = self._text_index()[1][r]
+        return start + sum(len(w.text) + 1 for w in self.rows[r].words[:i])
+
+    # -------------------------------------------------
+    # LABEL / VALUE PAIRS
+    # -------------------------------------------------
+    def label_values(self) -> Dict[str, FieldHit]:
+        """
+        First value found for each labelled field, as field-engine hits.
+        """
+        if self._pairs is None:
+            self._pairs = self._find_label_values()
+        return self._pairs
+
+    def _find_label_values(self) -> Dict[str, FieldHit]:
+        found: Dict[str, FieldHit] = {}
+
+        for r, row in enumerate(self.rows):
+            words = row.words
+            i = 0
+
+            while i < len(words):
+                match = self._label_at(words, i)
+                if match is None:
+                    i += 1
+                    continue
+
+                field, n_words = match
+                value_words = self._value_right(words, i + n_words)
+                j = i + n_words + len(value_words)
+
+                if not value_words:
+                    value_words = self._value_below(r, words[i])
+
+                value = " ".join(w.text for w in value_words).strip(" :-")
+
+                if value:
+                    start = self.offset(r, i)
+                    for name, parsed in _parse_field(field, value).items():
+                        if name not in found:
+                            found[name] = FieldHit(start, parsed)
+
+                i = max(j, i + 1)
+
+        return found
+
+    def _label_at(self, words: Tuple[Word, ...], i: int) -> Optional[Tuple[str, int]]:
+        # Longest label first
+        for n in range(min(_MAX_LABEL_WORDS, len(words) - i), 0, -1):
+            candidate = _clean(" ".join(w.text for w in words[i:i + n]))
+            if candidate not in LABELS:
+                continue
+
+            # A bare "Name" is only a label when a colon follows
+            # (not the "Test Name" column header of a lab table)
+            if candidate == "name" and not _has_colon(words, i + n):
+                continue
+
+            return LABELS[candidate], n
+        return None
+
+    def _value_right(self, words: Tuple[Word, ...], start: int) -> Tuple[Word, ...]:
+        value: List[Word] = []
+        prev_x1 = words[start - 1].x1 if start > 0 else None
+
+        for k in range(start, len(words)):
+            word = words[k]
+            if prev_x1 is not None and value and word.x0 - prev_x1 > COLUMN_GAP:
+                break
+            if self._label_at(words, k) is not None:
+                break
+            if word.text in (":", "-") and not value:
+                prev_x1 = word.x1
+                continue
+            value.append(word)
+            prev_x1 = word.x1
+
+        return tuple(value)
+
+    def _value_below(self, r: int, label: Word) -> Tuple[Word, ...]:
+        # Block directly under the label, in the label's column
+        for row in self.rows[r + 1:r + 3]:
+            below = tuple(w for w in row.words if w.x1 >= label.x0 - 2)
+            if below:
+                if self._label_at(below, 0) is not None:
+                    return ()
+                return below
+        return ()
+
+    # -------------------------------------------------
+    # LAB TABLES
+    # -------------------------------------------------
+    def lab_values(self) -> Dict[str, FieldHit]:
+        """
+        Analyte rows of lab tables ("name  value  unit  range") as
+        field-engine lab hits.
+        """
+        if self._labs is None:
+            self._labs = self._read_lab_rows()
+        return self._labs
+
+    def _read_lab_rows(self) -> Dict[str, FieldHit]:
+        synonyms = _synonym_index()
+        found: Dict[str, FieldHit] = {}
+
+        for r, row in enumerate(self.rows):
+            words = row.words
+
+            # Analyte name = words before the first number
+            for k, word in enumerate(words):
+                if _NUMBER.match(word.text):
+                    break
+            else:
+                continue
+
+            analyte = _match_analyte(synonyms, words[:k])
+            if analyte is None or FIELD_PREFIX + analyte in found:
+                continue
+
+            value = words[k].text.replace(",", "")
+            unit = words[k + 1].text if k + 1 < len(words) else ""
+            if _NUMBER.match(unit) or "-" in unit:
+                unit = ""
+
+            found[FIELD_PREFIX + analyte] = FieldHit(self.offset(r), f"{value} {unit}".rstrip())
+
+        return found
+
+    def field_hits(self) -> Dict[str, FieldHit]:
+        hits = dict(self.lab_values())
+        hits.update(self.label_values())
+        return hits
+
+
+def _parse_field(field: str, value: str) -> Dict[str, str]:
+    if field == "age":
+        m = _AGE.search(value)
+        return {"age": m.group(1)} if m else {}
+
+    if field == "gender":
+        m = _GENDER.search(value)
+        return {"gender": m.group(1)} if m else {}
+
+    if field == "age_sex":
+        parsed = {}
+        age, _, sex = value.partition("/")
+        if _AGE.search(age):
+            parsed["age"] = _AGE.search(age).group(1)
+        if _GENDER.search(sex):
+            parsed["gender"] = _GENDER.search(sex).group(1)
+        return parsed
+
+    return {field: value}
+
+
+_PARENTHETICAL = re.compile(r"\s*\([^)]*\)")
+
+
+def _match_analyte(synonyms: Dict[str, str], words: Tuple[Word, ...]) -> Optional[str]:
+    """
+    Analyte for a row's name cell: "Hemoglobin (Hb)", "Glucose Fasting"...
+    """
+    for n in range(len(words), 0, -1):
+        name = _clean(" ".join(w.text for w in words[:n]))
+        for candidate in (name, _PARENTHETICAL.sub("", name)):
+            if candidate in synonyms:
+                return synonyms[candidate]
+    return None
+
+
+_SYNONYMS: Optional[Dict[str, str]] = None
+
+
+def _synonym_index() -> Dict[str, str]:
+    global _SYNONYMS
+
+    if _SYNONYMS is None:
+        catalogue = get_catalogue()
+        _SYNONYMS = {
+            label: analyte_id
+            for analyte_id, labels in zip(catalogue.ids, catalogue.synonyms)
+            for label in labels
+        }
+    return _SYNONYMS
+
+
+# =====================================================
+# LOADING + CACHE
+# =====================================================
+_CACHE: "OrderedDict[str, DocumentLayout]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _rows_from_page(page_no: int, words: List[Dict]) -> List[Row]:
+    rows: List[Row] = []
+    current: List[Word] = []
+    row_top = None
+
+    for w in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        word = Word(w["text"], w["x0"], w["x1"], w["top"])
+
+        if row_top is not None and abs(word.top - row_top) > ROW_TOLERANCE:
+            rows.append(Row(page_no, tuple(sorted(current, key=lambda w: w.x0))))
+            current = []
+            row_top = None
+
+        if row_top is None:
+            row_top = word.top
+        current.append(word)
+
+    if current:
+        rows.append(Row(page_no, tuple(sorted(current, key=lambda w: w.x0))))
+
+    return rows
+
+
+def load_layout(pdf_bytes: bytes) -> DocumentLayout:
+    """
+    Word layout of a digital PDF, extracted once and cached by content.
+    """
+    key = hashlib.sha256(pdf_bytes).hexdigest()
+
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            count("cache_hits_total", cache="layout")
+            return _CACHE[key]
+
+    count("cache_misses_total", cache="layout")
+
+    rows: List[Row] = []
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        for page_no, page in enumerate(pdf.pages):
+            rows.extend(_rows_from_page(page_no, page.extract_words()))
+
+    layout = DocumentLayout(rows)
+
+    with _CACHE_LOCK:
+        _CACHE[key] = layout
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+    return layout
@@ -1,10 +1,19 @@
-import streamlit as st
-from groq import Groq
-def get_groq_client() -> Groq:
+from typing import TYPE_CHECKING
+
+from backend.router import SMALL_MODEL
+from backend.settings import get_setting
+from backend.telemetry import count, span
+
+if TYPE_CHECKING:
+    from groq import Groq
+def get_groq_client() -> "Groq":
     """
-    Create and return Groq client using Streamlit secrets.
+    Create and return Groq client using secrets.toml / env settings.
     """
-    api_key = st.secrets.get("GROQ_API_KEY")
+    # Imported on first call, not at module load
+    from groq import Groq
+
+    api_key = get_setting("GROQ_API_KEY")
 
     if not api_key:
         raise ValueError(
@@ -13,28 +22,36 @@ def get_groq_client() -> Groq:
         )
 
     return Groq(api_key=api_key)
-def call_llm(prompt: str) -> str:
+def call_llm(prompt: str, model: str = SMALL_MODEL) -> str:
     """
     Send prompt to Groq LLM and return generated text.
+
+    `model` comes from router.route_case (small model by default).
     """
     try:
         client = get_groq_client()
 
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a medical decision-support assistant."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,
-            max_tokens=800
-        )
+        with span("llm.call", model=model):
+            completion = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a medical decision-support assistant."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=800
+            )
+
+        if completion.usage is not None:
+            count("llm_tokens_total", completion.usage.prompt_tokens, kind="prompt")
+            count("llm_tokens_total", completion.usage.completion_tokens, kind="completion")
+
         return completion.choices[0].message.content.strip()
     except Exception as e:
         return (
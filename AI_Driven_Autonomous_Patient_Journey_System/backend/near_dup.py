@@ -0,0 +1,349 @@
+"""
+near_dup.py
+
+ROLE
+----
+Near-duplicate detection for re-uploaded reports.
+
+PURPOSE
+-------
+- Fingerprint an upload from its CHEAP first pass: the text layer
+  (SimHash of word 3-shingles) or, for scans, a low-DPI thumbnail of
+  page 1 (dHash); no OCR, no LLM
+- Index fingerprints in a local SQLite LSH table (8 bands of 8 bits):
+  any two fingerprints within 7 bits share at least one band, so the
+  candidate lookup is an indexed query, not a scan
+- Keep the extraction and plan of each analysed report with its
+  fingerprint, so a re-scan / re-export can reuse them
+
+NOTE
+----
+Same-template reports of DIFFERENT patients can look alike (especially
+as thumbnails): matches are offered to the user, never applied
+silently, and the offer shows only when and how close the earlier
+analysis is (the index is shared by every session: its patient data is
+revealed only to a user who chooses to reuse it).
+
+Environment:
+    NEAR_DUP=0               disable
+    NEAR_DUP_PATH=...        SQLite file (default <STATE_DIR>/near_dup.sqlite)
+    NEAR_DUP_ENTRIES=5000    reports kept (oldest evicted first)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from backend.settings import STATE_DIR
+from backend.telemetry import count
+
+ENABLED = os.getenv("NEAR_DUP", "1").lower() not in ("0", "false", "no", "off")
+INDEX_PATH = Path(os.getenv("NEAR_DUP_PATH", STATE_DIR / "near_dup.sqlite"))
+MAX_ENTRIES = int(os.getenv("NEAR_DUP_ENTRIES", "5000"))
+
+# Evict after this many inserts (not on every one)
+_EVICT_EVERY = 100
+
+TEXT = "text"
+IMAGE = "image"
+
+BITS = 64
+BANDS = 8
+BAND_BITS = BITS // BANDS
+
+# Largest Hamming distance still reported as a near-duplicate
+MAX_DISTANCE = {TEXT: 3, IMAGE: 5}
+
+# Fewer words than this: fingerprint the page image instead
+MIN_WORDS = 40
+SHINGLE = 3
+THUMBNAIL_DPI = 30
+
+_WORD = re.compile(r"\w+")
+
+
+class Fingerprint(NamedTuple):
+    kind: str      # TEXT | IMAGE
+    value: int     # unsigned 64-bit
+
+
+class Match(NamedTuple):
+    upload_key: str
+    distance: int
+    similarity: float
+    created: float
+    extraction: Dict[str, Any]
+    plan: Dict[str, Any]
+
+
+# =====================================================
+# FINGERPRINTS
+# =====================================================
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash of lowercase word 3-shingles; None for short texts.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+    hashes = np.array(
+        [hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles],
+        dtype="S8"
+    ).view(np.uint8).reshape(-1, 8)
+
+    # Bit votes: +1 where set, -1 where clear
+    bits = np.unpackbits(hashes, axis=1).astype(np.int32)
+    votes = bits.sum(axis=0) * 2 - len(shingles)
+
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+
+def dhash(image, size: int = 8) -> int:
+    """
+    64-bit gradient hash of a (thumbnail) page image.
+    """
+    from PIL import Image
+
+    small = image.convert("L").resize((size + 1, size), Image.BOX)
+    pixels = np.asarray(small, dtype=np.int16)
+    return int.from_bytes(np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes(), "big")
+
+
+def _thumbnail(data: bytes, kind: str):
+    from backend.extractor import POPPLER_PATH, load_image
+
+    if kind == "pdf":
+        from pdf2image import convert_from_bytes
+
+        pages = convert_from_bytes(
+            data,
+            dpi=THUMBNAIL_DPI,
+            first_page=1,
+            last_page=1,
+            poppler_path=POPPLER_PATH
+        )
+        return pages[0] if pages else None
+
+    return load_image(data)
+
+
+def fingerprint(data: bytes, kind: str) -> Optional[Fingerprint]:
+    """
+    Cheap fingerprint of an upload (`kind` from preflight), or None.
+    """
+    from backend.extractor import extract_text_from_docx
+    from backend.preflight import IMAGE_KINDS
+    from backend.text_layer import extract_pages
+
+    try:
+        if kind == "docx":
+            value = simhash(extract_text_from_docx(data))
+            return None if value is None else Fingerprint(TEXT, value)
+
+        if kind == "pdf":
+            value = simhash("\n".join(extract_pages(data)))
+            if value is not None:
+                return Fingerprint(TEXT, value)
+
+        if kind == "pdf" or kind in IMAGE_KINDS:
+            image = _thumbnail(data, kind)
+            return None if image is None else Fingerprint(IMAGE, dhash(image))
+    except Exception:
+        return None
+
+    return None
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(value: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def _signed(value: int) -> int:
+    # SQLite INTEGER is signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+# =====================================================
+# INDEX
+# =====================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id INTEGER PRIMARY KEY,
+    upload_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    created REAL NOT NULL,
+    extraction TEXT NOT NULL,
+    plan TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    fingerprint_id INTEGER NOT NULL REFERENCES fingerprints (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket);
+CREATE INDEX IF NOT EXISTS bands_owner ON bands (fingerprint_id);
+CREATE INDEX IF NOT EXISTS fingerprints_created ON fingerprints (created);
+"""
+
+
+class NearDuplicateIndex:
+    """
+    SQLite LSH index of analysed reports; one connection per thread.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._inserts = 0
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, upload_key: str, fp: Fingerprint, extraction: Dict, plan: Dict) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM fingerprints WHERE upload_key = ?", (upload_key,))
+            cur = conn.execute(
+                "INSERT INTO fingerprints (upload_key, kind, value, created, extraction, plan) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    upload_key, fp.kind, _signed(fp.value), time.time(),
+                    json.dumps(extraction, default=str), json.dumps(plan, default=str)
+                )
+            )
+            conn.executemany(
+                "INSERT INTO bands (band, bucket, fingerprint_id) VALUES (?, ?, ?)",
+                [(i, bucket, cur.lastrowid) for i, bucket in enumerate(_bands(fp.value))]
+            )
+
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % _EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop the oldest reports beyond max_entries (bands cascade).
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "DELETE FROM fingerprints WHERE id IN ("
+                "SELECT id FROM fingerprints ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        return cur.rowcount
+
+    def nearest(self, fp: Fingerprint, exclude: Optional[str] = None) -> Optional[Match]:
+        """
+        Closest indexed report within MAX_DISTANCE of `fp`, or None.
+        """
+        bands = _bands(fp.value)
+        rows = self._conn().execute(
+            "SELECT upload_key, value, created, extraction, plan FROM fingerprints "
+            "WHERE kind = ? AND id IN (SELECT fingerprint_id FROM bands WHERE "
+            + " OR ".join(["(band = ? AND bucket = ?)"] * BANDS) + ")",
+            [fp.kind] + [x for i, bucket in enumerate(bands) for x in (i, bucket)]
+        ).fetchall()
+
+        best = None
+        for upload_key, value, created, extraction, plan in rows:
+            if upload_key == exclude:
+                continue
+            distance = hamming(fp.value, value & ((1 << 64) - 1))
+            if distance <= MAX_DISTANCE[fp.kind] and (best is None or distance < best[0]):
+                best = (distance, upload_key, created, extraction, plan)
+
+        if best is None:
+            return None
+
+        distance, upload_key, created, extraction, plan = best
+        return Match(
+            upload_key=upload_key,
+            distance=distance,
+            similarity=round(1 - distance / BITS, 3),
+            created=created,
+            extraction=json.loads(extraction),
+            plan=json.loads(plan)
+        )
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+
+_INDEX: Optional[NearDuplicateIndex] = None
+
+
+def get_index() -> Optional[NearDuplicateIndex]:
+    global _INDEX
+
+    if not ENABLED:
+        return None
+    if _INDEX is None:
+        _INDEX = NearDuplicateIndex()
+    return _INDEX
+
+
+# =====================================================
+# PIPELINE HOOKS
+# =====================================================
+def find_duplicate(fp: Optional[Fingerprint], upload_key: str) -> Optional[Match]:
+    """
+    Previously analysed near-duplicate of this upload (not itself).
+    """
+    index = get_index()
+    if index is None or fp is None:
+        return None
+
+    try:
+        match = index.nearest(fp, exclude=upload_key)
+    except sqlite3.Error:
+        return None
+
+    count("near_duplicate_total", kind=fp.kind, found=str(match is not None).lower())
+    return match
+
+
+def remember(upload_key: str, fp: Optional[Fingerprint], extraction: Dict, plan: Dict) -> bool:
+    """
+    Index an analysed upload; False when disabled or not fingerprinted.
+    """
+    index = get_index()
+    if index is None or fp is None:
+        return False
+
+    try:
+        index.add(upload_key, fp, extraction, plan)
+    except sqlite3.Error:
+        return False
+    return True
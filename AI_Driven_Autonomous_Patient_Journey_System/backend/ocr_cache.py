@@ -0,0 +1,209 @@
+"""
+ocr_cache.py
+
+ROLE
+----
+Persistent page-level OCR cache.
+
+PURPOSE
+-------
+- Key every image sent to Tesseract by an exact content hash (SHA-256
+  of the cleaned bitmap bytes, mode and size)
+- Return the stored text for pages seen before (letterheads, consent
+  pages, lab legends), even inside an otherwise new document
+- Persist in a local SQLite file shared by every process, with LRU
+  eviction by last use
+
+NOTE
+----
+This is an exact-match cache: text is reused only for an image whose
+bytes are identical to one OCR'd before, so pages differing in a single
+digit never share text (no perceptual hashing, no similarity). Only the
+hash and the OCR text are stored, never the page image. Bump
+KEY_VERSION whenever preprocessing or Tesseract settings change.
+
+Environment:
+    OCR_CACHE=0              disable
+    OCR_CACHE_PATH=...       SQLite file (default <STATE_DIR>/ocr_pages.sqlite)
+    OCR_CACHE_ENTRIES=20000  entries kept
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from backend.settings import STATE_DIR
+from backend.telemetry import count
+
+KEY_VERSION = "v3"
+
+ENABLED = os.getenv("OCR_CACHE", "1").lower() not in ("0", "false", "no", "off")
+CACHE_PATH = Path(os.getenv("OCR_CACHE_PATH", STATE_DIR / "ocr_pages.sqlite"))
+MAX_ENTRIES = int(os.getenv("OCR_CACHE_ENTRIES", "20000"))
+
+# Evict after this many inserts (not on every one)
+_EVICT_EVERY = 100
+# Write buffered last-use times after this many hits (not on every read)
+_TOUCH_EVERY = 64
+
+
+# =====================================================
+# KEY
+# =====================================================
+def content_key(image: Image.Image) -> str:
+    """
+    SHA-256 of the image bytes, with its mode and size.
+    """
+    digest = hashlib.sha256(image.tobytes()).hexdigest()
+    return f"{KEY_VERSION}:{image.mode}:{image.width}x{image.height}:{digest}"
+
+
+# =====================================================
+# STORE
+# =====================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_pages (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ocr_pages_last_used ON ocr_pages (last_used);
+"""
+
+
+class OCRCache:
+    """
+    SQLite-backed text cache; one connection per thread.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._inserts = 0
+        self._touched: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT text FROM ocr_pages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._touch(key)
+        return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO ocr_pages (key, text, created, last_used) VALUES (?, ?, ?, ?)",
+            (key, text, now, now)
+        )
+
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % _EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            _, hits = self._touched.get(key, (0.0, 0))
+            self._touched[key] = (time.time(), hits + 1)
+            flush = len(self._touched) >= _TOUCH_EVERY
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write buffered last-use times and hit counts.
+        """
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE ocr_pages SET last_used = max(last_used, ?), hits = hits + ? WHERE key = ?",
+                [(used, hits, key) for key, (used, hits) in touched.items()]
+            )
+
+    def evict(self) -> int:
+        """
+        Drop the least recently used entries beyond max_entries.
+        """
+        self.flush()
+        cur = self._conn().execute(
+            "DELETE FROM ocr_pages WHERE key IN ("
+            "SELECT key FROM ocr_pages ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM ocr_pages").fetchone()[0]
+
+
+_CACHE: Optional[OCRCache] = None
+
+
+def get_cache() -> Optional[OCRCache]:
+    global _CACHE
+
+    if not ENABLED:
+        return None
+    if _CACHE is None:
+        _CACHE = OCRCache()
+    return _CACHE
+
+
+def cached_ocr(image: Image.Image, ocr) -> str:
+    """
+    ocr(image) through the page cache. Cache failures never fail OCR.
+    """
+    cache = get_cache()
+    if cache is None:
+        return ocr(image)
+
+    try:
+        key = content_key(image)
+        text = cache.get(key)
+    except sqlite3.Error:
+        return ocr(image)
+
+    if text is not None:
+        count("cache_hits_total", cache="ocr_page")
+        return text
+
+    count("cache_misses_total", cache="ocr_page")
+    text = ocr(image)
+
+    try:
+        cache.put(key, text)
+    except sqlite3.Error:
+        pass
+
+    return text
@@ -1,6 +1,15 @@
 import re
 from typing import Dict, List
 
+from backend.field_engine import scan_fields
+from backend.labs import extract_lab_panel
+from backend.pipeline import (  # noqa: F401 -- shared with extractor.py
+    analyse_text,
+    extract_chief_complaint,
+    extract_diagnosis,
+    radiology_findings
+)
+
 
 # -------------------------------------------------
 # HELPER FUNCTIONS
@@ -12,17 +21,21 @@ def normalize(text: str) -> str:
 # -------------------------------------------------
 # PATIENT INFO (SECONDARY CHECK)
 # -------------------------------------------------
+_AGE_YEARS = re.compile(r"\b(\d{1,3})\s*(years|yrs|y)\b", re.I)
+_GENDER_WORD = re.compile(r"\b(male|female|other)\b", re.I)
+
+
 def parse_patient_info(text: str) -> Dict:
     info = {
         "age": None,
         "gender": None
     }
 
-    age_match = re.search(r"\b(\d{1,3})\s*(years|yrs|y)\b", text, re.I)
+    age_match = _AGE_YEARS.search(text)
     if age_match:
         info["age"] = age_match.group(1)
 
-    gender_match = re.search(r"\b(male|female|other)\b", text, re.I)
+    gender_match = _GENDER_WORD.search(text)
     if gender_match:
         info["gender"] = gender_match.group(1).capitalize()
 
@@ -33,94 +46,27 @@ def parse_patient_info(text: str) -> Dict:
 # LAB FINDINGS
 # -------------------------------------------------
 def extract_lab_findings(text: str) -> List[str]:
-    findings = []
-
-    patterns = {
-        "Glucose": r"glucose\s*[:\-]?\s*(\d+)",
-        "Hemoglobin": r"hemoglobin\s*[:\-]?\s*(\d+\.?\d*)",
-        "Creatinine": r"creatinine\s*[:\-]?\s*(\d+\.?\d*)",
-        "Cholesterol": r"cholesterol\s*[:\-]?\s*(\d+)"
-    }
-
-    for test, pattern in patterns.items():
-        match = re.search(pattern, text, re.I)
-        if match:
-            findings.append(f"{test}: {match.group(1)}")
-
-    return findings
+    return extract_lab_panel(text).as_findings()
 
 
 # -------------------------------------------------
 # RADIOLOGY FINDINGS
 # -------------------------------------------------
 def extract_radiology_findings(text: str) -> List[str]:
-    findings = []
-
-    impression_match = re.search(
-        r"(impression|conclusion)[:\-]?\s*(.+)",
-        text, re.I | re.S
-    )
-
-    if impression_match:
-        line = impression_match.group(2).split("\n")[0].strip()
-        findings.append(line)
-
-    return findings
-
-
-# -------------------------------------------------
-# DIAGNOSIS EXTRACTION
-# -------------------------------------------------
-def extract_diagnosis(text: str) -> str:
-    patterns = [
-        r"final diagnosis[:\-]?\s*(.+)",
-        r"diagnosis[:\-]?\s*(.+)",
-        r"impression[:\-]?\s*(.+)"
-    ]
-
-    for p in patterns:
-        match = re.search(p, text, re.I)
-        if match:
-            return match.group(1).split("\n")[0].strip()
-
-    return "Diagnosis not clearly specified"
-
-
-# -------------------------------------------------
-# CHIEF COMPLAINT
-# -------------------------------------------------
-def extract_chief_complaint(text: str) -> str:
-    match = re.search(
-        r"(chief complaint|presenting complaint)[:\-]?\s*(.+)",
-        text, re.I
-    )
-    if match:
-        return match.group(2).strip()
-
-    return "Not mentioned"
+    return radiology_findings(scan_fields(text, ("impression",)))
 
 
 # -------------------------------------------------
 # MAIN PARSER (USED BY app.py)
 # -------------------------------------------------
 def parse_medical_report(raw_text: str, report_type: str) -> Dict:
-    text = normalize(raw_text)
-
-    diagnosis = extract_diagnosis(raw_text)
-    complaint = extract_chief_complaint(raw_text)
-
-    lab_findings = []
-    radiology_findings = []
-
-    if report_type == "lab":
-        lab_findings = extract_lab_findings(text)
-
-    if report_type == "radiology":
-        radiology_findings = extract_radiology_findings(raw_text)
+    # Same pipeline as extractor.process_diagnosis_report
+    ctx = analyse_text(raw_text, report_type, skip=("demographics",))
 
     return {
-        "chief_complaint": complaint,
-        "final_diagnosis": diagnosis,
-        "lab_findings": lab_findings,
-        "radiology_findings": radiology_findings
+        "chief_complaint": ctx.summary["chief_complaint"],
+        "final_diagnosis": ctx.summary["final_diagnosis"],
+        "lab_findings": ctx.summary.get("lab_findings", []),
+        "lab_results": ctx.summary.get("lab_results", []),
+        "radiology_findings": ctx.summary.get("radiology_findings", [])
     }
@@ -1,50 +1,91 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pypdf import PdfWriter
 from reportlab.platypus import (
     SimpleDocTemplate,
     Paragraph,
     Spacer,
     ListFlowable,
-    ListItem
+    ListItem,
+    PageBreak
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 
+from backend.telemetry import count, span
 
-def build_treatment_plan_pdf(patient: dict, summary: dict, plan: dict) -> str:
-    """
-    Builds a professional, hospital-style PDF treatment report
-    """
+DEFAULT_FILENAME = "AI_Treatment_Plan_Report.pdf"
 
-    filename = "AI_Treatment_Plan_Report.pdf"
+# Rendered reports kept in memory (by plan hash)
+RENDER_CACHE_SIZE = 64
 
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=A4,
-        rightMargin=36,
-        leftMargin=36,
-        topMargin=36,
-        bottomMargin=36
-    )
+# Bulk batches larger than this are rendered across processes
+BULK_PROCESS_THRESHOLD = 50
+# Reports per worker task in a process-parallel bulk render
+BULK_CHUNK_SIZE = 25
+
+# (patient, summary, plan)
+Report = Tuple[Dict, Dict, Dict]
+
+
+# -------------------------------------------------
+# STYLES (built once, read-only afterwards)
+# -------------------------------------------------
+class _Styles(NamedTuple):
+    title: ParagraphStyle
+    section: ParagraphStyle
+    normal: ParagraphStyle
+    heading3: ParagraphStyle
+    italic: ParagraphStyle
 
+
+def _build_styles() -> _Styles:
     styles = getSampleStyleSheet()
 
-    title_style = ParagraphStyle(
-        "TitleStyle",
-        parent=styles["Title"],
-        alignment=1
+    return _Styles(
+        title=ParagraphStyle(
+            "TitleStyle",
+            parent=styles["Title"],
+            alignment=1
+        ),
+        section=ParagraphStyle(
+            "SectionStyle",
+            parent=styles["Heading2"],
+            spaceAfter=12
+        ),
+        normal=ParagraphStyle(
+            "NormalStyle",
+            parent=styles["Normal"],
+            spaceAfter=8
+        ),
+        heading3=styles["Heading3"],
+        italic=styles["Italic"]
     )
 
-    section_style = ParagraphStyle(
-        "SectionStyle",
-        parent=styles["Heading2"],
-        spaceAfter=12
-    )
 
-    normal_style = ParagraphStyle(
-        "NormalStyle",
-        parent=styles["Normal"],
-        spaceAfter=8
-    )
+STYLES = _build_styles()
+
+
+def _build_story(patient: Dict, summary: Dict, plan: Dict) -> List:
+    """
+    Flowables for one treatment report.
+    """
+
+    title_style = STYLES.title
+    section_style = STYLES.section
+    normal_style = STYLES.normal
 
     story = []
 
@@ -87,7 +128,7 @@ def build_treatment_plan_pdf(patient: dict, summary: dict, plan: dict) -> str:
     )
 
     for section, items in treatment_sections.items():
-        story.append(Paragraph(section, styles["Heading3"]))
+        story.append(Paragraph(section, STYLES.heading3))
 
         bullet_items = [
             ListItem(Paragraph(item, normal_style))
@@ -139,12 +180,290 @@ def build_treatment_plan_pdf(patient: dict, summary: dict, plan: dict) -> str:
         "<i>Disclaimer: This AI-generated report is intended for clinical "
         "decision support only. Final diagnosis and treatment decisions "
         "must be made by a licensed medical professional.</i>",
-        styles["Italic"]
+        STYLES.italic
     ))
 
-    # -------------------------------------------------
-    # BUILD PDF
-    # -------------------------------------------------
-    doc.build(story)
+    return story
+
+
+# -------------------------------------------------
+# RENDERING
+# -------------------------------------------------
+def _document(out) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        out,
+        pagesize=A4,
+        rightMargin=36,
+        leftMargin=36,
+        topMargin=36,
+        bottomMargin=36
+    )
+
+
+def render_treatment_plan_pdf(patient: Dict, summary: Dict, plan: Dict) -> bytes:
+    """
+    Builds a professional, hospital-style PDF treatment report in memory
+
+    Returns:
+        bytes: The PDF document (no file is written)
+    """
+
+    buffer = BytesIO()
+
+    with span("pdf.build"):
+        _document(buffer).build(_build_story(patient, summary, plan))
+
+    return buffer.getvalue()
+
+
+def build_treatment_plan_pdf(
+    patient: dict,
+    summary: dict,
+    plan: dict,
+    filename: str = DEFAULT_FILENAME
+) -> str:
+    """
+    Builds the PDF treatment report and writes it to `filename`
+    """
+
+    with open(filename, "wb") as f:
+        f.write(render_treatment_plan_pdf(patient, summary, plan))
 
     return filename
+
+
+# -------------------------------------------------
+# BACKGROUND RENDERING (cached by plan hash)
+# -------------------------------------------------
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-render")
+_RENDERED: "OrderedDict[str, Future]" = OrderedDict()
+_RENDER_LOCK = threading.Lock()
+
+
+def plan_hash(patient: Dict, summary: Dict, plan: Dict) -> str:
+    """
+    Content hash of everything that ends up in the report.
+    """
+    payload = json.dumps(
+        [patient, summary, plan],
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prerender_treatment_plan_pdf(patient: Dict, summary: Dict, plan: Dict) -> str:
+    """
+    Start rendering the report in the background (once per plan).
+
+    Returns:
+        str: Plan hash to fetch the bytes with rendered_pdf()
+    """
+
+    key = plan_hash(patient, summary, plan)
+
+    with _RENDER_LOCK:
+        future = _RENDERED.get(key)
+        if future is not None and not (future.done() and future.exception()):
+            _RENDERED.move_to_end(key)
+            return key
+
+        _RENDERED[key] = _EXECUTOR.submit(
+            render_treatment_plan_pdf, patient, summary, plan
+        )
+        while len(_RENDERED) > RENDER_CACHE_SIZE:
+            _RENDERED.popitem(last=False)
+
+    return key
+
+
+def rendered_pdf(key: str, report: Optional[Report] = None, timeout: float = 60) -> bytes:
+    """
+    Bytes of a report started with prerender_treatment_plan_pdf().
+
+    Args:
+        key (str): Plan hash from prerender_treatment_plan_pdf()
+        report (optional): (patient, summary, plan) to render again,
+            synchronously, when the entry was evicted (more than
+            RENDER_CACHE_SIZE plans rendered since)
+
+    Raises:
+        KeyError: If the report is not cached and `report` is not given
+    """
+
+    with _RENDER_LOCK:
+        future = _RENDERED.get(key)
+
+    if future is None:
+        if report is None:
+            raise KeyError(key)
+        count("cache_misses_total", cache="pdf_render")
+        return render_treatment_plan_pdf(*report)
+
+    return future.result(timeout=timeout)
+
+
+# -------------------------------------------------
+# BULK RENDERING
+# -------------------------------------------------
+def _render_combined(reports: List[Report]) -> bytes:
+    """
+    One document, one template: every report starts on a new page.
+    """
+    story: List = []
+    for i, (patient, summary, plan) in enumerate(reports):
+        if i:
+            story.append(PageBreak())
+        story.extend(_build_story(patient, summary, plan))
+
+    buffer = BytesIO()
+    with span("pdf.build_bulk", reports=len(reports)):
+        _document(buffer).build(story)
+    return buffer.getvalue()
+
+
+def _render_each(reports: List[Report]) -> List[bytes]:
+    return [render_treatment_plan_pdf(*report) for report in reports]
+
+
+def _chunks(reports: Iterable[Report], size: int) -> Iterator[List[Report]]:
+    it = iter(reports)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _map_chunks(
+    func: Callable[[List[Report]], object],
+    reports: Iterable[Report],
+    workers: Optional[int]
+) -> Iterator:
+    """
+    func(chunk) for each chunk of reports, results in input order.
+
+    A small batch is ONE inline call. Large ones run in a process pool
+    with a bounded number of chunks in flight, so the input is consumed
+    lazily.
+    """
+    it = iter(reports)
+    head = list(islice(it, BULK_PROCESS_THRESHOLD + 1))
+
+    if len(head) <= BULK_PROCESS_THRESHOLD:
+        if head:
+            yield func(head)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    pending: deque = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(_chain(head, it), BULK_CHUNK_SIZE):
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _chain(head: List, rest: Iterator) -> Iterator:
+    yield from head
+    yield from rest
+
+
+def render_bulk_pdf(
+    reports: Iterable[Report],
+    out: BinaryIO,
+    workers: Optional[int] = None
+) -> int:
+    """
+    Render many treatment plans into ONE PDF, a page break between
+    patients, written to `out`.
+
+    NOTE: a single PDF cannot be streamed (its cross-reference table
+    needs every object), so nothing reaches `out` until the batch is
+    done. Rendered chunks are spooled to a temporary file, not held in
+    memory; the final stitch still loads the pages. Use
+    render_bulk_zip() to stream large batches.
+
+    Args:
+        reports: (patient, summary, plan) tuples
+        out: Writable binary stream (file, response body...)
+        workers (optional): Process count for large batches
+
+    Returns:
+        int: Number of reports rendered
+    """
+
+    total = 0
+
+    def counted() -> Iterator[Report]:
+        nonlocal total
+        for report in reports:
+            total += 1
+            yield report
+
+    with tempfile.TemporaryFile() as spool:
+        offsets = [0]
+        for part in _map_chunks(_render_combined, counted(), workers):
+            spool.write(part)
+            offsets.append(spool.tell())
+
+        if len(offsets) == 2:
+            spool.seek(0)
+            out.write(spool.read())
+        elif len(offsets) > 2:
+            # Process-parallel chunks: stitch the chunk documents together
+            writer = PdfWriter()
+            for start, end in zip(offsets, offsets[1:]):
+                spool.seek(start)
+                writer.append(BytesIO(spool.read(end - start)))
+            writer.write(out)
+
+    return total
+
+
+def _track(reports: Iterable[Report], patients: deque) -> Iterator[Report]:
+    # Names for ZIP entries; popped as each PDF is written, so only the
+    # chunks in flight are held
+    for report in reports:
+        patients.append(report[0])
+        yield report
+
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _entry_name(index: int, patient: Dict) -> str:
+    name = _UNSAFE.sub("_", str(patient.get("name") or "patient")).strip("_")
+    return f"{index:04d}_{name or 'patient'}.pdf"
+
+
+def render_bulk_zip(
+    reports: Iterable[Report],
+    out: BinaryIO,
+    workers: Optional[int] = None
+) -> int:
+    """
+    Render many treatment plans as a ZIP of per-patient PDFs, streamed
+    to `out` as each one is ready.
+
+    Returns:
+        int: Number of reports written
+    """
+
+    written = 0
+    patients: deque = deque()
+
+    # PDFs are already compressed
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+        for pdfs in _map_chunks(_render_each, _track(reports, patients), workers):
+            for pdf in pdfs:
+                written += 1
+                archive.writestr(_entry_name(written, patients.popleft()), pdf)
+
+    return written
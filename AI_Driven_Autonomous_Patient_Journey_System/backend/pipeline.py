@@ -0,0 +1,296 @@
+"""
+pipeline.py
+
+ROLE
+----
+Single staged extraction pipeline shared by extractor.py and parser.py.
+
+PURPOSE
+-------
+- Normalise the report text ONCE
+- Resolve every field the active stages need in ONE field-engine scan
+- Run each stage (type detection, demographics, diagnosis, labs,
+  radiology) against those shared views
+- Route by the classifier's report type: stages the type does not need
+  are skipped
+
+NOTE
+----
+Stages only read from the ReportContext and write their outputs into
+`details` / `summary`. They never rescan or copy the text themselves.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from backend.classifier import ReportClass, classify_report
+from backend.field_engine import FieldHit, scan_fields
+from backend.labs import build_lab_panel, lab_fields
+from backend.telemetry import span
+
+NOT_MENTIONED = "Not mentioned"
+NO_DIAGNOSIS = "Diagnosis not clearly specified"
+
+
+# =====================================================
+# SHARED VIEWS
+# =====================================================
+_NBSP = re.compile(r"[\u00a0\u2007\u202f]")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form every stage reads: "\\n" line endings, plain spaces.
+    """
+    return _NBSP.sub(" ", text.replace("\r\n", "\n")).strip()
+
+
+@dataclass
+class ReportContext:
+    text: str
+    report_type: str = ""
+    classification: Optional[ReportClass] = None
+    hits: Dict[str, FieldHit] = field(default_factory=dict)
+    details: Dict = field(default_factory=dict)
+    summary: Dict = field(default_factory=dict)
+    stages_run: List[str] = field(default_factory=list)
+
+
+# =====================================================
+# REPORT TYPE
+# =====================================================
+def detect_report_type(text: str) -> str:
+    return classify_report(text).label
+
+
+# =====================================================
+# FIELD RESOLUTION
+# =====================================================
+def patient_name(hits: Dict[str, FieldHit]) -> str:
+    if "name" in hits:
+        name = hits["name"].value.replace("\n", " ").strip()
+
+        # Remove trailing junk words
+        junk = ["patient", "age", "sex", "gender"]
+        if not any(j in name.lower() for j in junk):
+            return name
+
+    return NOT_MENTIONED
+
+
+def patient_age(hits: Dict[str, FieldHit]) -> str:
+    return hits["age"].value if "age" in hits else NOT_MENTIONED
+
+
+def patient_identifier(hits: Dict[str, FieldHit], field_name: str) -> str:
+    return hits[field_name].value.strip().upper() if field_name in hits else NOT_MENTIONED
+
+
+def patient_gender(hits: Dict[str, FieldHit]) -> str:
+    if "gender" in hits:
+        g = hits["gender"].value.upper()
+        return "Male" if g in ["M", "MALE"] else "Female"
+
+    return NOT_MENTIONED
+
+
+# Heading followed by the diagnosis line first, then inline values in
+# priority order
+# Inline values first; the next line under a bare heading last
+DIAGNOSIS_FIELDS = (
+    "final_diagnosis",
+    "diagnosis_inline",
+    "impression_inline",
+    "diagnosis"
+)
+
+
+def diagnosis(hits: Dict[str, FieldHit]) -> str:
+    value = NO_DIAGNOSIS
+
+    for f in DIAGNOSIS_FIELDS:
+        if f in hits and hits[f].value.strip():
+            value = hits[f].value.strip()
+            break
+
+    # Normalize normal findings
+    if value.lower().startswith("normal"):
+        value = "No abnormal findings detected"
+
+    return value
+
+
+COMPLAINT_FIELDS = ("chief_complaint", "admission_reason")
+
+
+def chief_complaint(hits: Dict[str, FieldHit]) -> str:
+    found = [hits[f] for f in COMPLAINT_FIELDS if f in hits]
+    if not found:
+        return NOT_MENTIONED
+
+    # Earliest label in the text wins
+    return min(found).value.strip()
+
+
+def extract_diagnosis(text: str) -> str:
+    return diagnosis(scan_fields(text, DIAGNOSIS_FIELDS))
+
+
+def extract_chief_complaint(text: str) -> str:
+    return chief_complaint(scan_fields(text, COMPLAINT_FIELDS))
+
+
+def radiology_findings(hits: Dict[str, FieldHit]) -> List[str]:
+    if "impression" in hits:
+        return [hits["impression"].value.split("\n")[0].strip()]
+
+    return []
+
+
+# =====================================================
+# STAGES
+# =====================================================
+class Stage(NamedTuple):
+    name: str
+    fields: Callable[[], Tuple[str, ...]]
+    run: Callable[[ReportContext], None]
+    # None = every report type
+    report_types: Optional[FrozenSet[str]] = None
+
+
+def _demographics(ctx: ReportContext) -> None:
+    ctx.details.update({
+        "name": patient_name(ctx.hits),
+        "age": patient_age(ctx.hits),
+        "gender": patient_gender(ctx.hits),
+        "patient_id": patient_identifier(ctx.hits, "patient_id"),
+        "dob": patient_identifier(ctx.hits, "dob")
+    })
+
+
+def _diagnosis(ctx: ReportContext) -> None:
+    value = diagnosis(ctx.hits)
+
+    # Radiology fallback
+    if ctx.report_type == "radiology" and value == NO_DIAGNOSIS:
+        value = "No acute cardiopulmonary process identified"
+
+    ctx.summary.update({
+        "final_diagnosis": value,
+        "chief_complaint": chief_complaint(ctx.hits)
+    })
+
+
+def _labs(ctx: ReportContext) -> None:
+    panel = build_lab_panel(ctx.hits)
+
+    ctx.summary.update({
+        "lab_findings": panel.as_findings(),
+        "lab_results": panel.to_records()
+    })
+
+
+def _radiology(ctx: ReportContext) -> None:
+    ctx.summary["radiology_findings"] = radiology_findings(ctx.hits)
+
+
+DEFAULT_STAGES: Tuple[Stage, ...] = (
+    Stage(
+        "demographics",
+        lambda: ("name", "age", "gender", "patient_id", "dob"),
+        _demographics
+    ),
+    Stage("diagnosis", lambda: DIAGNOSIS_FIELDS + COMPLAINT_FIELDS, _diagnosis),
+    Stage("labs", lab_fields, _labs, frozenset({"lab", "discharge"})),
+    Stage("radiology", lambda: ("impression",), _radiology, frozenset({"radiology"}))
+)
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+class ReportPipeline:
+    """
+    Runs the extraction stages over one shared ReportContext.
+    """
+
+    def __init__(self, stages: Iterable[Stage] = DEFAULT_STAGES):
+        self.stages = tuple(stages)
+
+    def active_stages(
+        self,
+        report_type: str,
+        skip: Iterable[str] = ()
+    ) -> Tuple[Stage, ...]:
+        skip = set(skip)
+
+        return tuple(
+            s for s in self.stages
+            if s.name not in skip
+            and (s.report_types is None or report_type in s.report_types)
+        )
+
+    def run(
+        self,
+        raw_text: str,
+        report_type: Optional[str] = None,
+        skip: Iterable[str] = (),
+        seed_hits: Optional[Dict[str, FieldHit]] = None
+    ) -> ReportContext:
+        """
+        Extract everything the report type needs from `raw_text`.
+
+        Args:
+            raw_text (str): Extracted report text
+            report_type (optional): Known type; detected when omitted
+            skip (optional): Stage names to leave out
+            seed_hits (optional): Fields already resolved elsewhere
+                (e.g. from the PDF layout); they are not rescanned
+
+        Returns:
+            ReportContext: details, summary and the stages that ran
+        """
+
+        ctx = ReportContext(text=normalize_text(raw_text))
+
+        if report_type:
+            ctx.report_type = report_type
+        else:
+            ctx.classification = classify_report(ctx.text)
+            ctx.report_type = ctx.classification.label
+            ctx.summary["report_confidence"] = ctx.classification.confidence
+
+        ctx.summary["report_type"] = ctx.report_type
+
+        stages = self.active_stages(ctx.report_type, skip)
+
+        seed_hits = seed_hits or {}
+
+        wanted: List[str] = []
+        for stage in stages:
+            wanted.extend(f for f in stage.fields() if f not in seed_hits)
+
+        # One scan serves every active stage
+        with span("fields.scan"):
+            ctx.hits = scan_fields(ctx.text, wanted)
+        ctx.hits.update(seed_hits)
+
+        for stage in stages:
+            with span("stage." + stage.name):
+                stage.run(ctx)
+            ctx.stages_run.append(stage.name)
+
+        return ctx
+
+
+PIPELINE = ReportPipeline()
+
+
+def analyse_text(
+    raw_text: str,
+    report_type: Optional[str] = None,
+    skip: Iterable[str] = (),
+    seed_hits: Optional[Dict[str, FieldHit]] = None
+) -> ReportContext:
+    return PIPELINE.run(raw_text, report_type, skip, seed_hits)
@@ -1,14 +1,20 @@
-import os
-import requests
-from typing import Dict
-import streamlit as st
+from typing import Dict, Mapping
+
+from backend.profiling import annotate, profiled
+from backend.protocols import Plan, get_library, thaw
+from backend.router import RULES, SMALL_MODEL, route_case
+from backend.settings import get_setting
+from backend.telemetry import count, span
 
 
 # -------------------------------------------------
 # GROQ CONFIGURATION
 # -------------------------------------------------
+# Default endpoint; GROQ_API_URL (settings) overrides it, e.g. for the
+# local mock used by scripts/loadtest.py
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_MODEL = "llama-3.1-8b-instant"
+# Default (small) model; router.py picks the model per request
+GROQ_MODEL = SMALL_MODEL
 
 
 # -------------------------------------------------
@@ -31,37 +37,41 @@ Rules:
 # LOAD GROQ API KEY (LOCAL + CLOUD SAFE)
 # -------------------------------------------------
 def get_groq_key() -> str | None:
-    # Streamlit Cloud
-    if "GROQ_API_KEY" in st.secrets:
-        return st.secrets["GROQ_API_KEY"]
-
-    # Local machine (env / .env)
-    return os.getenv("GROQ_API_KEY")
+    # secrets.toml (Streamlit Cloud / local), then env
+    return get_setting("GROQ_API_KEY")
 
 
 # -------------------------------------------------
 # MAIN TREATMENT PLAN GENERATOR
 # -------------------------------------------------
+def _describe_plan(plan: Dict, patient: Dict, summary: Dict) -> Dict:
+    return {
+        "report_type": summary.get("report_type"),
+        "solution_type": plan.get("solution_type")
+    }
+
+
+@profiled("generate_full_care_plan", describe=_describe_plan)
 def generate_full_care_plan(patient: Dict, summary: Dict) -> Dict:
-    api_key = get_groq_key()
-    if not api_key:
-        raise RuntimeError("❌ GROQ_API_KEY not found")
+    # One library snapshot for the whole request
+    library = get_library()
+    texts = library.planner
 
     # Fail-safe: no diagnosis
     if not summary.get("final_diagnosis"):
-        return {
-            "solution_type": "recommendation",
-            "identified_problem": "Insufficient diagnostic information",
-            "recommendation": [
-                "The uploaded report does not contain a clear diagnosis",
-                "Consult a qualified physician for further evaluation",
-                "Additional clinical assessment or investigations may be required"
-            ],
-            "appointment": {
-                "specialist": "General Physician",
-                "recommended_timeline": "As soon as possible"
-            }
-        }
+        return thaw(texts["insufficient_information"])
+
+    # Routine single-protocol cases skip the LLM; complex ones escalate
+    route = route_case(summary, library)
+    annotate(route=route.tier, route_reason=route.reason, model=route.model)
+
+    if route.tier == RULES:
+        with span("plan.rules"):
+            return _format_rules(summary, library.plan_for(route.protocols), texts)
+
+    api_key = get_groq_key()
+    if not api_key:
+        raise RuntimeError("❌ GROQ_API_KEY not found")
 
     user_prompt = f"""
 Patient Details:
@@ -88,7 +98,7 @@ Generate a structured doctor-like response with the following sections:
 """
 
     payload = {
-        "model": GROQ_MODEL,
+        "model": route.model,
         "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt}
@@ -96,36 +106,55 @@ Generate a structured doctor-like response with the following sections:
         "temperature": 0.2
     }
 
-    response = requests.post(
-        GROQ_API_URL,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        },
-        json=payload,
-        timeout=60
-    )
+    # Imported on first call: requests is slow to import
+    import requests
+
+    with span("llm.call", model=route.model, tier=route.tier):
+        response = requests.post(
+            get_setting("GROQ_API_URL", GROQ_API_URL),
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            },
+            json=payload,
+            timeout=60
+        )
 
     if response.status_code != 200:
+        count("llm_errors_total", status=str(response.status_code))
         raise RuntimeError(
             f"GROQ API ERROR {response.status_code}: {response.text}"
         )
 
-    ai_text = response.json()["choices"][0]["message"]["content"]
+    data = response.json()
+    usage = data.get("usage") or {}
+    count("llm_tokens_total", usage.get("prompt_tokens", 0), kind="prompt")
+    count("llm_tokens_total", usage.get("completion_tokens", 0), kind="completion")
+
+    ai_text = data["choices"][0]["message"]["content"]
 
-    return _format_for_ui(summary, ai_text)
+    return _format_for_ui(summary, ai_text, texts)
 
 
 # -------------------------------------------------
 # FORMAT AI RESPONSE FOR EXISTING UI
 # -------------------------------------------------
-def _format_for_ui(summary: Dict, ai_text: str) -> Dict:
+def _format_for_ui(summary: Dict, ai_text: str, texts: Mapping) -> Dict:
     lines = [
         line.strip("-• ")
         for line in ai_text.split("\n")
         if line.strip()
     ]
 
+    return _plan_dict(summary, {texts["treatment_section_title"]: lines}, texts)
+
+
+def _format_rules(summary: Dict, plan: Plan, texts: Mapping) -> Dict:
+    # Protocol sections as-is (merged plans keep their own headings)
+    return _plan_dict(summary, thaw(plan), texts)
+
+
+def _plan_dict(summary: Dict, sections: Dict, texts: Mapping) -> Dict:
     return {
         "solution_type": "treatment",
         "identified_problem": summary.get(
@@ -133,21 +162,8 @@ def _format_for_ui(summary: Dict, ai_text: str) -> Dict:
             "Medical condition identified"
         ),
         "treatment_plan": {
-            "treatment_sections": {
-                "Doctor Recommended Treatment Plan": lines
-            }
-        },
-        "estimated_cost": {
-            "consultation": "₹500 – ₹1,500",
-            "investigations": "₹2,000 – ₹10,000",
-            "medications": "₹1,000 – ₹5,000",
-            "follow_up_cost": "₹500 – ₹2,000",
-            "notes": "Estimated by AI clinician; varies by hospital and location"
+            "treatment_sections": sections
         },
-        "appointment": {
-            "urgency": "Based on clinical severity",
-            "specialist": "Relevant medical specialist",
-            "recommended_timeline": "As soon as possible",
-            "follow_up_frequency": "As advised by physician"
-        }
+        "estimated_cost": thaw(texts["estimated_cost"]),
+        "appointment": thaw(texts["appointment"])
     }
@@ -0,0 +1,373 @@
+"""
+preflight.py
+
+ROLE
+----
+Cheap upload checks that run BEFORE any parsing, rasterising or OCR.
+
+PURPOSE
+-------
+- Sniff the file type from its magic bytes (not the file name)
+- Read DOCX page counts from docProps/app.xml (no rendering)
+- Count PDF pages from the page tree's /Count without a full parse
+- Estimate the worst-case rasterisation / OCR cost
+- Decide: accept, queue (heavy job: run when a heavy slot is free) or
+  reject with a user-facing reason
+
+NOTE
+----
+Page counting reads /Count from the root /Pages node only, then falls
+back to counting /Type /Page objects and finally to pypdf (compressed
+object streams hide the page tree from a byte scan). A PDF with fonts,
+including fonts inside compressed object streams, is assumed to carry a
+text layer and will not need OCR.
+"""
+
+import re
+import struct
+import threading
+import zipfile
+import zlib
+from io import BytesIO
+from typing import NamedTuple, Optional, Tuple
+
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_PAGES = 50
+MAX_IMAGE_MEGAPIXELS = 60.0
+
+OCR_DPI = 300
+# A4 at OCR_DPI: 2480 x 3508 px
+PAGE_MEGAPIXELS = (8.27 * OCR_DPI) * (11.69 * OCR_DPI) / 1e6
+# Rough single-core Tesseract throughput
+OCR_SECONDS_PER_MEGAPIXEL = 0.3
+
+# Estimated OCR work above which a job is queued / rejected
+QUEUE_OCR_SECONDS = 30.0
+REJECT_OCR_SECONDS = 300.0
+
+# Heavy (queued) jobs allowed to run at once per process
+HEAVY_JOBS = 1
+
+ACCEPT = "accept"
+QUEUE = "queue"
+REJECT = "reject"
+
+
+class PreflightError(ValueError):
+    """
+    Upload rejected before processing. `code` is one of: empty,
+    unsupported, too_large, too_many_pages, corrupt, too_costly.
+    """
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message, code)
+        self.message = message
+        self.code = code
+
+    def __str__(self) -> str:
+        return self.message
+
+
+class Preflight(NamedTuple):
+    kind: str                 # "pdf" | "docx" | "png" | "jpeg" | "tiff"
+    size: int                 # bytes
+    pages: int
+    has_text_layer: bool
+    megapixels: float         # pixels to OCR if OCR is needed
+    ocr_seconds: float        # estimated OCR time
+    decision: str             # ACCEPT | QUEUE
+
+
+# =====================================================
+# FILE TYPE
+# =====================================================
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+)
+
+IMAGE_KINDS = frozenset({"png", "jpeg", "tiff"})
+
+_DOCX_PART = b"word/document.xml"
+
+
+def sniff(data: bytes) -> Optional[str]:
+    """
+    File type from magic bytes, or None when unsupported.
+    """
+    for magic, kind in _MAGIC:
+        if data.startswith(magic):
+            return kind
+
+    # PDF header may follow a little junk (allowed by most readers)
+    if b"%PDF-" in data[:1024]:
+        return "pdf"
+
+    # DOCX is a zip; entry names are stored uncompressed
+    if data.startswith(b"PK\x03\x04") and _DOCX_PART in data:
+        return "docx"
+
+    return None
+
+
+# =====================================================
+# PDF PAGE COUNT
+# =====================================================
+_PAGES_NODE = re.compile(rb"/Type\s*/Pages\b")
+_COUNT = re.compile(rb"/Count\s+(\d+)")
+_PAGE_OBJECT = re.compile(rb"/Type\s*/Page\b(?!s)")
+_EOF = b"%%EOF"
+_OBJ = b" obj"
+_ENDOBJ = b"endobj"
+
+
+def _tree_count(data: bytes) -> Optional[int]:
+    # /Count of the root /Pages node: the one without a /Parent. Only the
+    # node's own object is read, so an /Outlines /Count next to it is
+    # never picked up. The last root wins (incremental updates).
+    root = None
+    for match in _PAGES_NODE.finditer(data):
+        start = data.rfind(_OBJ, 0, match.start())
+        end = data.find(_ENDOBJ, match.end())
+        if start < 0 or end < 0:
+            continue
+        node = data[start:end]
+        if b"/Parent" in node:
+            continue
+        counts = _COUNT.findall(node)
+        if len(counts) == 1:
+            root = int(counts[0])
+    return root
+
+
+def count_pdf_pages(data: bytes) -> Optional[int]:
+    """
+    Page count without parsing the document; None when unreadable.
+    """
+    pages = _tree_count(data)
+    if pages:
+        return pages
+
+    pages = len(_PAGE_OBJECT.findall(data))
+    if pages:
+        return pages
+
+    # Object streams: let pypdf read just the xref and page tree
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(BytesIO(data)).pages)
+    except Exception:
+        return None
+
+
+# =====================================================
+# PDF TEXT LAYER
+# =====================================================
+_FONT = b"/Font"
+_OBJECT_STREAM = re.compile(rb"/Type\s*/ObjStm\b")
+_STREAM = re.compile(rb"stream\r?\n")
+_ENDSTREAM = b"endstream"
+
+
+def _object_streams(data: bytes):
+    # Inflated bodies of the /ObjStm objects (PDF 1.5+ compressed objects)
+    for match in _OBJECT_STREAM.finditer(data):
+        stream = _STREAM.search(data, match.end())
+        if stream is None:
+            continue
+        end = data.find(_ENDSTREAM, stream.end())
+        if end < 0:
+            continue
+        yield zlib.decompressobj().decompress(data[stream.end():end])
+
+
+def has_text_layer(data: bytes) -> bool:
+    """
+    True when the PDF declares fonts, i.e. pdftotext / pypdf will find
+    text and the pages need no OCR.
+    """
+    if _FONT in data:
+        return True
+    if not _OBJECT_STREAM.search(data):
+        return False
+
+    # Font dictionaries are usually compressed inside object streams
+    try:
+        return any(_FONT in body for body in _object_streams(data))
+    except zlib.error:
+        pass
+
+    try:
+        from pypdf import PdfReader
+        for page in PdfReader(BytesIO(data)).pages:
+            resources = page.get("/Resources") or {}
+            if "/Font" in resources:
+                return True
+    except Exception:
+        pass
+    return False
+
+
+# =====================================================
+# DOCX PAGE COUNT
+# =====================================================
+_DOCX_PAGES = re.compile(rb"<Pages>(\d+)</Pages>")
+
+
+def count_docx_pages(data: bytes) -> Optional[int]:
+    """
+    Page count saved by Word (1 when absent); None when unreadable.
+    """
+    try:
+        with zipfile.ZipFile(BytesIO(data)) as docx:
+            if _DOCX_PART.decode() not in docx.namelist():
+                return None
+            try:
+                props = docx.read("docProps/app.xml")
+            except KeyError:
+                return 1
+    except (zipfile.BadZipFile, OSError):
+        return None
+
+    match = _DOCX_PAGES.search(props)
+    return max(int(match.group(1)), 1) if match else 1
+
+
+# =====================================================
+# IMAGE SIZE
+# =====================================================
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(data: bytes, kind: str) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) from the image header only.
+    """
+    if kind == "png" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+
+    if kind == "jpeg":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker == 0xFF:
+                # Fill byte
+                i += 1
+                continue
+            if marker in _JPEG_SOF:
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return width, height
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            (length,) = struct.unpack(">H", data[i + 2:i + 4])
+            i += 2 + length
+
+    if kind == "tiff":
+        try:
+            from PIL import Image
+            return Image.open(BytesIO(data)).size
+        except Exception:
+            return None
+
+    return None
+
+
+# =====================================================
+# PREFLIGHT
+# =====================================================
+def preflight(data: bytes) -> Preflight:
+    """
+    Inspect an upload and decide whether (and how) to process it.
+
+    Raises:
+        PreflightError: When the upload must be rejected
+    """
+
+    if not data:
+        raise PreflightError("The uploaded file is empty.", "empty")
+
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise PreflightError(
+            f"File is too large ({len(data) / 1e6:.1f} MB, "
+            f"limit {MAX_UPLOAD_BYTES / 1e6:.0f} MB).",
+            "too_large"
+        )
+
+    kind = sniff(data)
+    if kind is None:
+        raise PreflightError(
+            "Unsupported file type. Please upload a PDF, DOCX, JPG or PNG report.",
+            "unsupported"
+        )
+
+    if kind == "pdf":
+        if _EOF not in data[-2048:]:
+            raise PreflightError("The PDF file is truncated or corrupted.", "corrupt")
+
+        pages = count_pdf_pages(data)
+        if not pages:
+            raise PreflightError("The PDF file has no readable pages.", "corrupt")
+        if pages > MAX_PAGES:
+            raise PreflightError(
+                f"The PDF has {pages} pages (limit {MAX_PAGES}).",
+                "too_many_pages"
+            )
+
+        has_text = has_text_layer(data)
+        megapixels = 0.0 if has_text else pages * PAGE_MEGAPIXELS
+
+    elif kind == "docx":
+        # Text comes straight from the XML: no OCR, no page limit
+        pages = count_docx_pages(data)
+        if pages is None:
+            raise PreflightError("The Word document is corrupted.", "corrupt")
+        has_text, megapixels = True, 0.0
+
+    else:
+        size = image_size(data, kind)
+        if size is None or not all(size):
+            raise PreflightError("The image file is corrupted.", "corrupt")
+
+        pages, has_text = 1, False
+        megapixels = size[0] * size[1] / 1e6
+        if megapixels > MAX_IMAGE_MEGAPIXELS:
+            raise PreflightError(
+                f"The image is too large ({megapixels:.0f} megapixels).",
+                "too_large"
+            )
+        # Oversized photos are downscaled to one A4 page before OCR
+        megapixels = min(megapixels, PAGE_MEGAPIXELS)
+
+    ocr_seconds = megapixels * OCR_SECONDS_PER_MEGAPIXEL
+    if ocr_seconds > REJECT_OCR_SECONDS:
+        raise PreflightError(
+            "This scanned report is too large to process. "
+            "Please upload fewer pages.",
+            "too_costly"
+        )
+
+    return Preflight(
+        kind=kind,
+        size=len(data),
+        pages=pages,
+        has_text_layer=has_text,
+        megapixels=round(megapixels, 1),
+        ocr_seconds=round(ocr_seconds, 1),
+        decision=QUEUE if ocr_seconds > QUEUE_OCR_SECONDS else ACCEPT
+    )
+
+
+_HEAVY = threading.BoundedSemaphore(HEAVY_JOBS)
+
+
+def heavy_slot() -> threading.BoundedSemaphore:
+    """
+    Context manager: hold one of the HEAVY_JOBS slots for a queued job.
+    """
+    return _HEAVY
@@ -0,0 +1,216 @@
+"""
+profiling.py
+
+ROLE
+----
+Opt-in sampling profiler for slow requests.
+
+PURPOSE
+-------
+- Sample the request thread's stack while a profiled call runs
+  (process_diagnosis_report, generate_full_care_plan)
+- Keep the profile ONLY when the call exceeded a latency threshold
+- Save it as JSON next to the request's page count, report type and
+  per-stage timings (telemetry spans) for offline analysis
+
+NOTE
+----
+Off unless PROFILE_SLOW_MS is set (threshold in milliseconds). When off,
+a profiled call costs one global check.
+
+Stacks are stored in "folded" form ("file:function;file:function" ->
+sample count), which flamegraph.pl and speedscope read directly.
+
+Environment:
+    PROFILE_SLOW_MS=2000     keep profiles of calls slower than this
+    PROFILE_DIR=profiles     where profiles are written
+    PROFILE_KEEP=200         newest profiles kept on disk
+"""
+
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from backend.telemetry import trace
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+MAX_DEPTH = 64
+
+_THRESHOLD_MS = float(os.getenv("PROFILE_SLOW_MS", "0") or 0)
+_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+# Files _save() writes: <name>-<YYYYmmdd-HHMMSS.mmm>-<elapsed>ms.json
+_PROFILE_FILE = re.compile(r".+-\d{8}-\d{6}\.\d{3}-\d+ms\.json")
+
+# Request facts gathered while a profiled call runs (None = not profiling)
+_NOTES: ContextVar[Optional[Dict]] = ContextVar("profile_notes", default=None)
+
+_WRITE_LOCK = threading.Lock()
+
+
+def configure(threshold_ms: float, directory: Optional[str] = None) -> None:
+    """
+    Turn profiling on (threshold_ms > 0) or off (0).
+    """
+    global _THRESHOLD_MS, _DIR
+
+    _THRESHOLD_MS = threshold_ms
+    if directory:
+        _DIR = Path(directory)
+
+
+def annotate(**facts) -> None:
+    """
+    Attach facts (e.g. pages=3) to the profile of the current request.
+    """
+    notes = _NOTES.get()
+    if notes is not None:
+        notes.update(facts)
+
+
+# =====================================================
+# SAMPLER
+# =====================================================
+def _fold(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples one thread's stack every `interval` seconds until stopped.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+# =====================================================
+# PROFILED CALLS
+# =====================================================
+def profiled(name: str, describe: Optional[Callable[..., Dict]] = None):
+    """
+    Decorator: profile the call, save the profile if it was slow.
+
+    Args:
+        name (str): Profile name (file prefix)
+        describe (optional): describe(result, *args, **kwargs) -> facts
+            to store with the profile (report type, ...)
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Off, or already inside a profiled call
+            if _THRESHOLD_MS <= 0 or _NOTES.get() is not None:
+                return func(*args, **kwargs)
+            return _run_profiled(name, describe, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _run_profiled(name, describe, func, args, kwargs):
+    notes: Dict = {}
+    token = _NOTES.set(notes)
+    sampler = _Sampler(threading.get_ident())
+    result, error = None, None
+
+    sampler.start()
+    started = time.time()
+    t0 = time.perf_counter()
+
+    try:
+        with trace() as spans:
+            result = func(*args, **kwargs)
+        return result
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        stacks = sampler.stop()
+        _NOTES.reset(token)
+
+        if elapsed_ms >= _THRESHOLD_MS:
+            if describe is not None and error is None:
+                try:
+                    notes.update(describe(result, *args, **kwargs))
+                except Exception:
+                    pass
+
+            _save({
+                "name": name,
+                "started": round(started, 3),
+                "elapsed_ms": round(elapsed_ms, 1),
+                "threshold_ms": _THRESHOLD_MS,
+                "error": repr(error) if error is not None else None,
+                "request": notes,
+                "stages": _stage_timings(spans),
+                "sample_interval_ms": SAMPLE_INTERVAL * 1000,
+                "samples": sum(stacks.values()),
+                "stacks": dict(stacks.most_common())
+            })
+
+
+def _stage_timings(spans) -> Dict[str, Dict]:
+    stages: Dict[str, Dict] = {}
+    for stage, seconds in spans:
+        entry = stages.setdefault(stage, {"count": 0, "ms": 0.0})
+        entry["count"] += 1
+        entry["ms"] = round(entry["ms"] + seconds * 1000, 3)
+    return stages
+
+
+def _save(profile: Dict) -> None:
+    started = profile["started"]
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started))
+    stamp += f".{int(started * 1000) % 1000:03d}"
+    path = _DIR / f"{profile['name']}-{stamp}-{int(profile['elapsed_ms'])}ms.json"
+
+    with _WRITE_LOCK:
+        try:
+            _DIR.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(profile, f, indent=1, default=str)
+
+            # Bound disk use: newest _KEEP profiles only. Other JSON
+            # files in the directory are not ours to delete
+            saved = sorted(
+                (p for p in _DIR.glob("*.json") if _PROFILE_FILE.fullmatch(p.name)),
+                key=os.path.getmtime
+            )
+            for old in saved[:-_KEEP]:
+                old.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,397 @@
+"""
+protocols.py
+
+ROLE
+----
+Data-driven clinical protocol engine behind treatment_llm.py.
+
+PURPOSE
+-------
+- Load versioned condition protocols from data/protocols.json
+- Match every condition named in a problem statement in ONE pass over a
+  compiled synonym automaton
+- Merge the plans of co-existing conditions (e.g. diabetes + hypertension)
+- Serve precompiled, read-only plan templates shared across calls
+- Serve the planner's fallback text (insufficient information, cost and
+  appointment defaults)
+- Hot-reload: watch the file, compile a new library off the request path
+  and swap it in atomically
+
+NOTE
+----
+Protocol order in the file is priority order: it decides section order
+and item order when plans are merged. A "standalone" protocol (e.g. a
+normal ECG) only applies when no other condition matched.
+
+Callers must take ONE library from get_library() per request and use it
+throughout, so a swap in the middle of a request never mixes versions.
+A file that fails validation is logged and ignored; the current library
+keeps serving.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from backend.field_engine import build_keyword_pattern
+from backend.telemetry import count
+
+logger = logging.getLogger(__name__)
+
+PROTOCOLS_PATH = Path(os.getenv(
+    "PROTOCOLS_PATH",
+    Path(__file__).resolve().parent.parent / "data" / "protocols.json"
+))
+
+SUPPORTED_SCHEMA = 1
+
+# Seconds between checks of the protocol file
+POLL_INTERVAL = 2.0
+
+PLANNER_TEXTS = (
+    "insufficient_information",
+    "treatment_section_title",
+    "estimated_cost",
+    "appointment"
+)
+
+# Read-only plan: section -> steps
+Plan = Mapping[str, Tuple[str, ...]]
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+class Protocol(NamedTuple):
+    id: str
+    title: str
+    synonyms: Tuple[str, ...]
+    standalone: bool
+    plan: Plan
+
+
+def _freeze_plan(sections: Dict[str, List[str]]) -> Plan:
+    return MappingProxyType({
+        section: tuple(items) for section, items in sections.items()
+    })
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def normalize_condition(text: str) -> str:
+    """
+    Lowercase words only: "Hypertension." and "hypertension" compare equal.
+    """
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def thaw(value: Any) -> Any:
+    """
+    Mutable (JSON-serialisable) copy of a read-only library value.
+    """
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+# =====================================================
+# VALIDATION
+# =====================================================
+def validate_protocols(data: Dict) -> None:
+    """
+    Check a protocol document before it is compiled.
+
+    Raises:
+        ValueError: Describing the first problem found
+    """
+
+    if data.get("schema") != SUPPORTED_SCHEMA:
+        raise ValueError(f"Unsupported protocol schema: {data.get('schema')}")
+
+    if not data.get("version"):
+        raise ValueError("Protocol file has no version")
+
+    entries = list(data.get("protocols") or [])
+    if "fallback" not in data:
+        raise ValueError("Protocol file has no fallback plan")
+
+    seen_ids, owner = set(), {}
+    for entry in entries + [data["fallback"]]:
+        pid = entry.get("id")
+        if not pid or pid in seen_ids:
+            raise ValueError(f"Missing or duplicate protocol id: {pid!r}")
+        seen_ids.add(pid)
+
+        sections = entry.get("sections")
+        if not isinstance(sections, dict) or not sections:
+            raise ValueError(f"Protocol {pid} has no sections")
+        for section, items in sections.items():
+            if not isinstance(items, list) or not all(isinstance(i, str) for i in items):
+                raise ValueError(f"Protocol {pid}: section '{section}' must be a list of strings")
+
+        for synonym in entry.get("synonyms", []):
+            key = synonym.lower()
+            if not key:
+                raise ValueError(f"Protocol {pid} has an empty synonym")
+            if key in owner and owner[key] != pid:
+                raise ValueError(f"Synonym '{synonym}' used by {owner[key]} and {pid}")
+            owner[key] = pid
+
+    for entry in entries:
+        if not entry.get("synonyms"):
+            raise ValueError(f"Protocol {entry['id']} has no synonyms")
+
+    planner = data.get("planner")
+    if not isinstance(planner, dict):
+        raise ValueError("Protocol file has no planner section")
+    for key in PLANNER_TEXTS:
+        if not planner.get(key):
+            raise ValueError(f"Planner section is missing '{key}'")
+
+
+# =====================================================
+# COMPILED LIBRARY
+# =====================================================
+class ProtocolLibrary:
+    """
+    Immutable, compiled protocol set.
+    """
+
+    def __init__(self, data: Dict):
+        validate_protocols(data)
+
+        self.version: str = str(data["version"])
+        self.protocols: Tuple[Protocol, ...] = tuple(
+            Protocol(
+                id=entry["id"],
+                title=entry.get("title", entry["id"]),
+                synonyms=tuple(s.lower() for s in entry["synonyms"]),
+                standalone=bool(entry.get("standalone", False)),
+                plan=_freeze_plan(entry["sections"])
+            )
+            for entry in data["protocols"]
+        )
+        self.fallback: Plan = _freeze_plan(data["fallback"]["sections"])
+        self.planner: Mapping[str, Any] = _freeze(data["planner"])
+
+        self._priority = {p.id: i for i, p in enumerate(self.protocols)}
+        self._by_id = {p.id: p for p in self.protocols}
+        owner = {
+            synonym: p.id for p in self.protocols for synonym in p.synonyms
+        }
+
+        # The automaton reports the longest synonym at a position; shorter
+        # synonyms that prefix it match there too
+        self._candidates: Dict[str, FrozenSet[str]] = {
+            synonym: frozenset(
+                pid for other, pid in owner.items() if synonym.startswith(other)
+            )
+            for synonym in owner
+        }
+
+        # Substring semantics, overlapping matches all visited
+        self._pattern = re.compile(
+            "(?=(" + build_keyword_pattern(owner) + "))",
+            re.I
+        )
+
+        # Whole-statement lookup: normalised title or synonym -> id
+        self._exact: Dict[str, str] = {
+            normalize_condition(name): p.id
+            for p in self.protocols
+            for name in (p.title,) + p.synonyms
+        }
+
+        self._merged: Dict[FrozenSet[str], Plan] = {}
+
+    # -------------------------------------------------
+    # MATCHING
+    # -------------------------------------------------
+    def match(self, problem: str) -> Tuple[str, ...]:
+        """
+        Ids of every protocol named in `problem`, in priority order.
+        """
+        found = set()
+
+        for m in self._pattern.finditer(problem):
+            found.update(self._candidates[m.group(1).lower()])
+
+        if any(not self._by_id[pid].standalone for pid in found):
+            found = {pid for pid in found if not self._by_id[pid].standalone}
+
+        return tuple(sorted(found, key=self._priority.__getitem__))
+
+    def exact(self, problem: str) -> Optional[str]:
+        """
+        Id of the protocol whose title or synonym IS the whole problem
+        statement (after normalisation), or None. Unlike match(), no
+        substring hits: "pulmonary hypertension" or "myocardial
+        infarction ruled out" are not exact.
+        """
+        return self._exact.get(normalize_condition(problem))
+
+    # -------------------------------------------------
+    # PLANS
+    # -------------------------------------------------
+    def plan_for(self, protocol_ids: Tuple[str, ...]) -> Plan:
+        """
+        Shared read-only plan for a set of matched protocols.
+        """
+        if not protocol_ids:
+            return self.fallback
+        if len(protocol_ids) == 1:
+            return self._by_id[protocol_ids[0]].plan
+
+        key = frozenset(protocol_ids)
+        plan = self._merged.get(key)
+        if plan is None:
+            count("cache_misses_total", cache="protocol_plan")
+            plan = self._merge(protocol_ids)
+            self._merged[key] = plan
+        else:
+            count("cache_hits_total", cache="protocol_plan")
+        return plan
+
+    def _merge(self, protocol_ids: Tuple[str, ...]) -> Plan:
+        merged: Dict[str, List[str]] = {}
+
+        for pid in sorted(protocol_ids, key=self._priority.__getitem__):
+            for section, items in self._by_id[pid].plan.items():
+                bucket = merged.setdefault(section, [])
+                bucket.extend(i for i in items if i not in bucket)
+
+        return _freeze_plan(merged)
+
+    def plan_for_problem(self, problem: str) -> Plan:
+        return self.plan_for(self.match(problem))
+
+    def warm(self, combinations: Iterable[FrozenSet[str]]) -> None:
+        """
+        Precompute merged plans (e.g. those the previous library served).
+        """
+        for key in combinations:
+            ids = tuple(pid for pid in key if pid in self._by_id)
+            if len(ids) > 1:
+                self.plan_for(ids)
+
+
+# =====================================================
+# LOADING
+# =====================================================
+def load_library(path: Path = PROTOCOLS_PATH) -> ProtocolLibrary:
+    with open(path, encoding="utf-8") as f:
+        return ProtocolLibrary(json.load(f))
+
+
+_LIBRARY: Optional[ProtocolLibrary] = None
+_LOAD_LOCK = threading.Lock()
+
+
+def get_library() -> ProtocolLibrary:
+    global _LIBRARY
+
+    library = _LIBRARY
+    if library is None:
+        with _LOAD_LOCK:
+            if _LIBRARY is None:
+                _LIBRARY = load_library()
+            library = _LIBRARY
+
+    return library
+
+
+def reload_library(path: Path = PROTOCOLS_PATH) -> bool:
+    """
+    Compile the protocol file and swap it in.
+
+    Returns:
+        bool: False when the file is invalid; the current library stays
+    """
+    global _LIBRARY
+
+    try:
+        library = load_library(path)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning("Protocol reload rejected (%s): %s", path, e)
+        return False
+
+    # Merged plans the old library built are built again before the swap
+    current = _LIBRARY
+    if current is not None:
+        library.warm(list(current._merged))
+
+    # Rebinding one global is atomic: readers see the old or the new
+    # library, never a partial one
+    _LIBRARY = library
+    logger.info("Protocol library %s loaded from %s", library.version, path)
+
+    return True
+
+
+# =====================================================
+# FILE WATCHER
+# =====================================================
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ProtocolWatcher(threading.Thread):
+    """
+    Daemon thread polling the protocol file; reloads when it changes.
+    """
+
+    def __init__(self, path: Path = PROTOCOLS_PATH, interval: float = POLL_INTERVAL):
+        super().__init__(name="protocol-watcher", daemon=True)
+        self.path = path
+        self.interval = interval
+        self._stamp = _file_stamp(path)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            stamp = _file_stamp(self.path)
+            if stamp is None or stamp == self._stamp:
+                continue
+
+            # A half-written file fails validation; the write that
+            # completes it changes the stamp again
+            self._stamp = stamp
+            reload_library(self.path)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+_WATCHER: Optional[ProtocolWatcher] = None
+
+
+def start_protocol_watcher(interval: float = POLL_INTERVAL) -> ProtocolWatcher:
+    """
+    Load the library (if needed) and start the watcher, once per process.
+    """
+    global _WATCHER
+
+    with _LOAD_LOCK:
+        if _WATCHER is None or not _WATCHER.is_alive():
+            # Stamp taken before the load, so no edit in between is missed
+            _WATCHER = ProtocolWatcher(PROTOCOLS_PATH, interval)
+            _WATCHER.start()
+
+    get_library()
+    return _WATCHER
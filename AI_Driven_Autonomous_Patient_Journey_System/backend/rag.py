@@ -21,6 +21,8 @@ This is an in-memory RAG:
 
 from typing import List, Dict
 
+from backend.telemetry import count, span
+
 # =====================================================
 # IN-MEMORY KNOWLEDGE BASE
 # =====================================================
@@ -69,9 +71,12 @@ def query_rag(query: str, top_k: int = 3) -> List[str]:
     query = query.lower()
     matches = []
 
-    for item in _KNOWLEDGE_BASE:
-        if query in item["diagnosis"]:
-            matches.append(item["text"])
+    with span("rag.query"):
+        for item in _KNOWLEDGE_BASE:
+            if query in item["diagnosis"]:
+                matches.append(item["text"])
+
+    count("cache_hits_total" if matches else "cache_misses_total", cache="rag")
 
     # Return most recent matches
     return matches[-top_k:]
@@ -0,0 +1,174 @@
+"""
+result_store.py
+
+ROLE
+----
+Bounded memo of pipeline results (extraction, treatment plan) keyed by
+upload hash.
+
+PURPOSE
+-------
+- Streamlit re-runs app.py on every interaction: a rerun for the same
+  upload must not OCR the report or call the LLM again
+- One small store per session (st.session_state) in front of one
+  process-wide shared store, so an identical upload from another
+  session is also served from memory
+- LRU eviction by entry count; explicit invalidation per upload
+
+NOTE
+----
+Keys are (upload hash, stage). Values are stored as-is and must be
+treated as read-only by callers.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from backend.telemetry import count
+
+SESSION_STORE_SIZE = 16
+SHARED_STORE_SIZE = 256
+
+_MISSING = object()
+
+
+def upload_key(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+# =====================================================
+# STORE
+# =====================================================
+class ResultStore:
+    """
+    Thread-safe LRU mapping with single-flight computation.
+    """
+
+    def __init__(self, max_entries: int, name: str = "results"):
+        self.max_entries = max_entries
+        self.name = name
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            hit = key in self._data
+            if hit:
+                self._data.move_to_end(key)
+                self.hits += 1
+                value = self._data[key]
+            else:
+                self.misses += 1
+                value = default
+
+        count("cache_hits_total" if hit else "cache_misses_total", cache=self.name)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Cached value for `key`; concurrent callers compute it only once.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._inflight.setdefault(key, threading.Lock())
+
+        try:
+            with flight:
+                # Another caller may have finished while we waited
+                with self._lock:
+                    value = self._data.get(key, _MISSING)
+                if value is _MISSING:
+                    value = compute()
+                    self.put(key, value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        return value
+
+    def invalidate(self, upload: Optional[str] = None) -> int:
+        """
+        Drop every stage of one upload (or everything when None).
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            if upload is None:
+                removed = len(self._data)
+                self._data.clear()
+                return removed
+
+            keys = [k for k in self._data if isinstance(k, tuple) and k[0] == upload]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+
+SHARED_STORE = ResultStore(SHARED_STORE_SIZE, name="results_shared")
+
+
+# =====================================================
+# SESSION + SHARED LOOKUP
+# =====================================================
+class PipelineResults:
+    """
+    Per-session view: session store first, then the shared store.
+    """
+
+    def __init__(
+        self,
+        session: Optional[ResultStore] = None,
+        shared: ResultStore = SHARED_STORE
+    ):
+        if session is None:
+            session = ResultStore(SESSION_STORE_SIZE, name="results_session")
+
+        self.session = session
+        self.shared = shared
+
+    def get_or_compute(
+        self,
+        upload: str,
+        stage: str,
+        compute: Callable[[], Any],
+        session_only: bool = False
+    ) -> Any:
+        """
+        Stage result for an upload. `session_only` results (e.g. a
+        near-duplicate this user chose to reuse) never reach the shared
+        store, so other sessions cannot be served them.
+        """
+        key: Tuple[str, str] = (upload, stage)
+
+        value = self.session.get(key, _MISSING)
+        if value is _MISSING:
+            if session_only:
+                value = compute()
+            else:
+                value = self.shared.get_or_compute(key, compute)
+            self.session.put(key, value)
+
+        return value
+
+    def invalidate(self, upload: str) -> None:
+        self.session.invalidate(upload)
+        self.shared.invalidate(upload)
@@ -0,0 +1,193 @@
+"""
+roi_ocr.py
+
+ROLE
+----
+Region-of-interest OCR for scanned reports.
+
+PURPOSE
+-------
+- Find text blocks cheaply from the row projection of the cleaned 1-bit
+  page (no OCR needed)
+- OCR only where the fields live: the header blocks of page 1
+  (demographics) and the closing blocks of the last page
+  (impression / diagnosis)
+- Widen step by step (whole first / last page, then every page) only
+  while a required field is still missing
+
+NOTE
+----
+Required fields are the demographics and a diagnosis, plus a chief
+complaint for report types that carry one (discharge summaries and
+generic diagnosis reports; lab, radiology, ECG and pathology reports
+rarely do). A complaint written mid-page (outside the header / closing
+blocks) must widen the OCR, not be silently dropped from the result.
+
+ROI OCR is opt-in: the Streamlit app always OCRs every page; API clients
+enable it with /extract?roi=1.
+
+Lab-type reports (tables anywhere on any page) go straight to full OCR
+once the ROI text shows what they are.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from backend.classifier import DEFAULT_TYPE, classify_report
+from backend.field_engine import scan_fields
+from backend.ocr_preprocess import NOISE_PIXELS, PreparedPage, prepare_page
+from backend.pipeline import COMPLAINT_FIELDS, DEFAULT_STAGES, DIAGNOSIS_FIELDS
+
+# Blank rows (px at 300 dpi) that separate two text blocks
+BLOCK_GAP = 30
+# Share of the content height searched for header / closing blocks
+HEADER_FRACTION = 0.35
+TAIL_FRACTION = 0.45
+PADDING = 10
+
+DEMOGRAPHIC_FIELDS = ("name", "age", "gender")
+
+# Report types whose stages need whole-page tables
+FULL_PAGE_TYPES = frozenset().union(*(
+    s.report_types for s in DEFAULT_STAGES
+    if s.name == "labs" and s.report_types
+))
+# Report types whose text is expected to state a chief complaint
+COMPLAINT_TYPES = frozenset({DEFAULT_TYPE, "discharge"})
+
+
+# =====================================================
+# TEXT BLOCKS
+# =====================================================
+def row_bands(bitmap: Image.Image) -> List[Tuple[int, int]]:
+    """
+    (top, bottom) of each text block, top to bottom.
+    """
+    ink = np.asarray(bitmap.convert("L")) < 128
+    rows = np.flatnonzero(ink.sum(axis=1) >= NOISE_PIXELS)
+    if not len(rows):
+        return []
+
+    breaks = np.flatnonzero(np.diff(rows) > BLOCK_GAP)
+    starts = np.r_[rows[0], rows[breaks + 1]]
+    ends = np.r_[rows[breaks], rows[-1]] + 1
+
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _crop_rows(bitmap: Image.Image, top: int, bottom: int) -> Image.Image:
+    top = max(top - PADDING, 0)
+    bottom = min(bottom + PADDING, bitmap.height)
+    return bitmap.crop((0, top, bitmap.width, bottom))
+
+
+def header_region(bitmap: Image.Image) -> Optional[Image.Image]:
+    limit = bitmap.height * HEADER_FRACTION
+    bands = [b for b in row_bands(bitmap) if b[0] < limit]
+    if not bands:
+        return None
+    return _crop_rows(bitmap, 0, bands[-1][1])
+
+
+def tail_region(bitmap: Image.Image) -> Optional[Image.Image]:
+    limit = bitmap.height * (1 - TAIL_FRACTION)
+    bands = [b for b in row_bands(bitmap) if b[1] > limit]
+    if not bands:
+        return None
+    return _crop_rows(bitmap, bands[0][0], bitmap.height)
+
+
+# =====================================================
+# TIERED OCR
+# =====================================================
+def missing_fields(text: str, report_type: Optional[str] = None) -> List[str]:
+    """
+    Required fields (demographics, a diagnosis and, for COMPLAINT_TYPES,
+    a chief complaint) not found in `text`. The report type is detected
+    when omitted.
+    """
+    if report_type is None:
+        report_type = classify_report(text).label
+
+    hits = scan_fields(text, DEMOGRAPHIC_FIELDS + DIAGNOSIS_FIELDS + COMPLAINT_FIELDS)
+
+    missing = [f for f in DEMOGRAPHIC_FIELDS if f not in hits]
+    if not any(hits[f].value.strip() for f in DIAGNOSIS_FIELDS if f in hits):
+        missing.append("diagnosis")
+    if report_type in COMPLAINT_TYPES and not any(
+        hits[f].value.strip() for f in COMPLAINT_FIELDS if f in hits
+    ):
+        missing.append("chief_complaint")
+    return missing
+
+
+def _complete(text: str) -> bool:
+    report_type = classify_report(text).label
+    if report_type in FULL_PAGE_TYPES:
+        return False
+    return not missing_fields(text, report_type)
+
+
+def roi_ocr(
+    images: List[Image.Image],
+    ocr: Callable[[Image.Image, int], str]
+) -> Tuple[str, str]:
+    """
+    OCR as little of the document as the required fields allow.
+
+    Args:
+        images: Rasterised pages
+        ocr: ocr(image, page_no) -> text for one (pre-cleaned) image
+
+    Returns:
+        (text, tier): tier is "roi", "edge_pages" or "full"
+    """
+
+    if not images:
+        return "", "full"
+
+    prepared: Dict[int, PreparedPage] = {}
+
+    def page(i: int) -> Optional[Image.Image]:
+        if i not in prepared:
+            prepared[i] = prepare_page(images[i])
+        return prepared[i].image
+
+    last = len(images) - 1
+    done: Dict[int, str] = {}
+
+    # Tier 1: header of page 1 + closing blocks of the last page
+    parts = []
+    first = page(0)
+    if first is not None:
+        region = header_region(first)
+        if region is not None:
+            parts.append(ocr(region, 0))
+
+    closing = page(last)
+    if closing is not None:
+        region = tail_region(closing)
+        if region is not None:
+            parts.append(ocr(region, last))
+
+    text = "\n".join(parts)
+    if _complete(text):
+        return text, "roi"
+
+    # Tier 2: whole first and last pages
+    for i in sorted({0, last}):
+        if page(i) is not None:
+            done[i] = ocr(page(i), i)
+
+    text = "\n".join(done.values())
+    if _complete(text):
+        return text, "edge_pages"
+
+    # Tier 3: every page, in order
+    for i in range(len(images)):
+        if i not in done and page(i) is not None:
+            done[i] = ocr(page(i), i)
+
+    return "\n".join(done[i] for i in sorted(done)), "full"
@@ -0,0 +1,127 @@
+"""
+router.py
+
+ROLE
+----
+Per-request choice of care-plan backend and model.
+
+PURPOSE
+-------
+- "rules": the diagnosis IS a protocol condition in data/protocols.json
+  (whole statement equals its title or a synonym) -> the rule engine
+  (no LLM call)
+- "small": routine single-problem reports the protocols do not cover,
+  or only mention (negated, qualified) -> the small, fast model
+- "large": multi-problem, ambiguous or undiagnosed reports -> the
+  larger model
+- Record every decision (tier + reason) and its latency in telemetry
+
+NOTE
+----
+library.match() is a substring search with no notion of negation or
+qualifiers: "myocardial infarction ruled out", "pregnancy induced
+hypertension" and "diabetes insipidus" all match a protocol whose plan
+would be wrong. Those never take the rule engine.
+
+Settings (secrets.toml / env): ROUTER_RULES=0 sends protocol matches to
+the small model instead of the rule engine; ROUTER_SMALL_MODEL and
+ROUTER_LARGE_MODEL override the models.
+"""
+
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from backend.protocols import ProtocolLibrary, get_library
+from backend.settings import get_setting
+from backend.telemetry import count, span
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+RULES = "rules"
+SMALL = "small"
+LARGE = "large"
+
+# Report-type confidence below this means competing report types
+AMBIGUOUS_CONFIDENCE = 0.3
+# Diagnoses longer than this are narratives, not a single condition
+MAX_SIMPLE_DIAGNOSIS = 120
+
+# Separators between co-existing problems in one diagnosis line
+_PROBLEM_SPLIT = re.compile(r"[;,+\n]|\band\b|\bwith\b", re.I)
+
+# Statements that exclude, rather than name, a condition
+_NEGATION = re.compile(
+    r"\b(?:no|not|without|negative for|free of|absence of|denies)\b|"
+    r"\b(?:ruled|rule) out\b|\bexcluded\b|\bunlikely\b",
+    re.I
+)
+
+
+class Route(NamedTuple):
+    tier: str                       # RULES | SMALL | LARGE
+    model: Optional[str]            # None for the rule engine
+    reason: str
+    protocols: Tuple[str, ...]      # matched protocol ids
+
+
+def _enabled(value) -> bool:
+    return str(value).lower() not in ("0", "false", "no", "off")
+
+
+def count_problems(diagnosis: str) -> int:
+    return sum(1 for part in _PROBLEM_SPLIT.split(diagnosis) if part and part.strip())
+
+
+# =====================================================
+# ROUTING
+# =====================================================
+def route_case(summary: Dict, library: Optional[ProtocolLibrary] = None) -> Route:
+    """
+    Pick the backend / model for one care plan.
+
+    Args:
+        summary (dict): summary_data from process_diagnosis_report
+        library (optional): Protocol snapshot (default: current library)
+
+    Returns:
+        Route: Tier, model, reason and matched protocol ids
+    """
+
+    with span("router.decide"):
+        route = _decide(summary, library or get_library())
+
+    count("router_decisions_total", tier=route.tier, reason=route.reason)
+    return route
+
+
+def _decide(summary: Dict, library: ProtocolLibrary) -> Route:
+    # Lazy: llm_client imports this module and must stay light
+    from backend.pipeline import NO_DIAGNOSIS
+
+    small = get_setting("ROUTER_SMALL_MODEL", SMALL_MODEL)
+    large = get_setting("ROUTER_LARGE_MODEL", LARGE_MODEL)
+
+    diagnosis = (summary.get("final_diagnosis") or "").strip()
+    if not diagnosis or diagnosis == NO_DIAGNOSIS:
+        return Route(LARGE, large, "no_diagnosis", ())
+
+    protocols = library.match(diagnosis)
+
+    if len(protocols) > 1 or count_problems(diagnosis) > 1:
+        return Route(LARGE, large, "multi_problem", protocols)
+
+    confidence = float(summary.get("report_confidence", 1.0))
+    if confidence < AMBIGUOUS_CONFIDENCE or len(diagnosis) > MAX_SIMPLE_DIAGNOSIS:
+        return Route(LARGE, large, "ambiguous", protocols)
+
+    if protocols:
+        if _NEGATION.search(diagnosis):
+            return Route(SMALL, small, "negated", protocols)
+        if library.exact(diagnosis) is None:
+            return Route(SMALL, small, "qualified_match", protocols)
+        if _enabled(get_setting("ROUTER_RULES", "1")):
+            return Route(RULES, None, "protocol_match", protocols)
+        return Route(SMALL, small, "protocol_match", protocols)
+
+    return Route(SMALL, small, "unmatched", protocols)
@@ -0,0 +1,98 @@
+"""
+settings.py
+
+ROLE
+----
+Streamlit-free configuration layer.
+
+PURPOSE
+-------
+- Read secrets / settings without importing Streamlit, so batch workers,
+  the API and CLI tools neither pay its import cost nor need its runtime
+- Same sources the UI uses: .streamlit/secrets.toml (project, then
+  home directory) and environment variables
+
+NOTE
+----
+Lookup order: secrets.toml (as st.secrets did), then the environment.
+Streamlit Cloud also exports root-level secrets as environment
+variables, so deployed apps resolve the same values either way.
+
+Local stores that hold patient data (OCR cache, near-duplicate index,
+journey database) live under STATE_DIR, outside the source tree:
+$PATIENT_JOURNEY_STATE, else $XDG_CACHE_HOME/patient_journey, else
+~/.cache/patient_journey.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SECRETS_PATHS: List[Path] = [
+    BASE_DIR / ".streamlit" / "secrets.toml",
+    Path.cwd() / ".streamlit" / "secrets.toml",
+    Path.home() / ".streamlit" / "secrets.toml"
+]
+
+STATE_DIR = Path(
+    os.getenv("PATIENT_JOURNEY_STATE")
+    or Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "patient_journey"
+)
+
+_SECRETS: Optional[Dict[str, Any]] = None
+_LOCK = threading.Lock()
+
+
+def _load_secrets() -> Dict[str, Any]:
+    secrets: Dict[str, Any] = {}
+    if tomllib is None:
+        return secrets
+
+    # Earlier files win, as in Streamlit
+    for path in reversed(SECRETS_PATHS):
+        try:
+            with open(path, "rb") as f:
+                secrets.update(tomllib.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return secrets
+
+
+def secrets() -> Dict[str, Any]:
+    """
+    Parsed secrets.toml contents (read once per process).
+    """
+    global _SECRETS
+
+    if _SECRETS is None:
+        with _LOCK:
+            if _SECRETS is None:
+                _SECRETS = _load_secrets()
+    return _SECRETS
+
+
+def get_setting(name: str, default: Any = None) -> Any:
+    """
+    Value of `name` from secrets.toml, else the environment, else `default`.
+    """
+    value = secrets().get(name)
+    if value not in (None, ""):
+        return value
+
+    value = os.getenv(name)
+    if value not in (None, ""):
+        return value
+
+    return default
@@ -0,0 +1,329 @@
+"""
+telemetry.py
+
+ROLE
+----
+Lightweight latency / resource instrumentation for the whole pipeline.
+
+PURPOSE
+-------
+- span("ocr.page") timings around each stage (pypdf read, rasterise,
+  OCR per page, field extraction, LLM call, PDF build)
+- Counters: cache hits / misses, pages OCR'd, LLM tokens
+- Prometheus text exposition (optional local /metrics exporter) and an
+  optional JSON-lines sink, one record per span
+- Per-request trace: every span closed inside `trace()` is collected, so
+  a slow request can be broken down stage by stage
+
+NOTE
+----
+Off unless TELEMETRY=1 (or enable() is called). When off, span() hands
+back one shared no-op context manager and count() returns at once: the
+cost is a global check per call. An active trace() records its own spans
+even when telemetry is off.
+
+Environment:
+    TELEMETRY=1            turn instrumentation on
+    TELEMETRY_LOG=path     append span records as JSON lines ("-" = stderr)
+    TELEMETRY_PORT=9464    serve /metrics on 127.0.0.1:<port>
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ENABLED = os.getenv("TELEMETRY", "0").lower() in ("1", "true", "yes", "on")
+
+_LOCK = threading.Lock()
+
+# (metric, labels) -> value
+_COUNTERS: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+# span name -> [bucket counts..., +Inf count, sum]
+_HISTOGRAMS: Dict[str, List[float]] = {}
+
+# Spans closed during the current request
+_TRACE: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("trace", default=None)
+
+_SINK = None
+
+
+def enable(flag: bool = True) -> None:
+    global _ENABLED
+    _ENABLED = flag
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+# =====================================================
+# SPANS
+# =====================================================
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "_start")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self._start
+
+        trace = _TRACE.get()
+        if trace is not None:
+            trace.append((self.name, seconds))
+
+        if _ENABLED:
+            _observe(self.name, seconds)
+            if exc_type is not None:
+                count("stage_errors_total", stage=self.name)
+            if _SINK is not None:
+                _write_record(self.name, seconds, exc_type, self.attrs)
+
+
+def span(name: str, **attrs):
+    """
+    Time a block of work:
+
+        with span("ocr.page", page=3):
+            ...
+
+    Args:
+        name (str): Stage name (the Prometheus "stage" label)
+        attrs: Extra fields for the JSON sink only (not metric labels)
+    """
+    if not _ENABLED and _TRACE.get() is None:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+@contextmanager
+def trace() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Collect (span name, seconds) for every span closed inside the block.
+    """
+    spans: List[Tuple[str, float]] = []
+    token = _TRACE.set(spans)
+    try:
+        yield spans
+    finally:
+        _TRACE.reset(token)
+
+
+# =====================================================
+# METRICS
+# =====================================================
+def count(name: str, value: float = 1, **labels: str) -> None:
+    """
+    Add `value` to a counter, e.g. count("ocr_pages_total").
+    """
+    if not _ENABLED:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0) + value
+
+
+def _observe(name: str, seconds: float) -> None:
+    with _LOCK:
+        hist = _HISTOGRAMS.get(name)
+        if hist is None:
+            hist = _HISTOGRAMS[name] = [0.0] * (len(BUCKETS) + 2)
+
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += 1
+        hist[-1] += seconds
+
+
+def snapshot() -> Dict:
+    """
+    Current counters and per-stage totals (count, seconds).
+    """
+    with _LOCK:
+        return {
+            "counters": {
+                _series(name, dict(labels)): value
+                for (name, labels), value in _COUNTERS.items()
+            },
+            "stages": {
+                name: {"count": int(hist[-2]), "seconds": hist[-1]}
+                for name, hist in _HISTOGRAMS.items()
+            }
+        }
+
+
+def reset() -> None:
+    with _LOCK:
+        _COUNTERS.clear()
+        _HISTOGRAMS.clear()
+
+
+# =====================================================
+# PROMETHEUS EXPOSITION
+# =====================================================
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    body = ",".join(
+        f'{k}="{_escape(str(v))}"' for k, v in sorted(labels.items())
+    )
+    return f"{name}{{{body}}}"
+
+
+def render_prometheus() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+
+    with _LOCK:
+        counters = sorted(_COUNTERS.items())
+        histograms = sorted((k, list(v)) for k, v in _HISTOGRAMS.items())
+
+    typed = set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{_series(name, dict(labels))} {value:g}")
+
+    if histograms:
+        lines.append("# TYPE stage_duration_seconds histogram")
+    for stage, hist in histograms:
+        for bound, n in zip(BUCKETS, hist):
+            labels = {"stage": stage, "le": f"{bound:g}"}
+            lines.append(f"{_series('stage_duration_seconds_bucket', labels)} {n:g}")
+        labels = {"stage": stage, "le": "+Inf"}
+        lines.append(f"{_series('stage_duration_seconds_bucket', labels)} {hist[-2]:g}")
+        lines.append(f"{_series('stage_duration_seconds_sum', {'stage': stage})} {hist[-1]:.6f}")
+        lines.append(f"{_series('stage_duration_seconds_count', {'stage': stage})} {hist[-2]:g}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_handler():
+    # http.server is only imported when the exporter actually starts
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return _MetricsHandler
+
+
+_EXPORTER = None
+
+
+def start_exporter(port: int, host: str = "127.0.0.1"):
+    """
+    Serve /metrics from a daemon thread (once per process); returns the
+    ThreadingHTTPServer.
+    """
+    global _EXPORTER
+
+    with _LOCK:
+        if _EXPORTER is None:
+            from http.server import ThreadingHTTPServer
+
+            _EXPORTER = ThreadingHTTPServer((host, port), _metrics_handler())
+            threading.Thread(
+                target=_EXPORTER.serve_forever,
+                name="metrics-exporter",
+                daemon=True
+            ).start()
+
+    return _EXPORTER
+
+
+# =====================================================
+# JSON SINK
+# =====================================================
+_SINK_LOCK = threading.Lock()
+
+
+def set_sink(path: Optional[str]) -> None:
+    """
+    Send one JSON line per span to `path` ("-" = stderr, None = off).
+    """
+    global _SINK
+
+    if _SINK is not None and _SINK is not sys.stderr:
+        _SINK.close()
+
+    if not path:
+        _SINK = None
+    elif path == "-":
+        _SINK = sys.stderr
+    else:
+        _SINK = open(path, "a", encoding="utf-8", buffering=1)
+
+
+def _write_record(name: str, seconds: float, exc_type, attrs: Dict) -> None:
+    record = {
+        "ts": round(time.time(), 3),
+        "span": name,
+        "seconds": round(seconds, 6),
+        "ok": exc_type is None
+    }
+    record.update(attrs)
+
+    line = json.dumps(record, default=str)
+    with _SINK_LOCK:
+        sink = _SINK
+        if sink is not None:
+            sink.write(line + "\n")
+
+
+# =====================================================
+# STARTUP
+# =====================================================
+if _ENABLED:
+    set_sink(os.getenv("TELEMETRY_LOG"))
+
+    if os.getenv("TELEMETRY_PORT"):
+        start_exporter(int(os.environ["TELEMETRY_PORT"]))
@@ -0,0 +1,234 @@
+"""
+text_layer.py
+
+ROLE
+----
+Pluggable text-layer extraction for digital PDFs.
+
+PURPOSE
+-------
+- One interface, several backends: extract(pdf_bytes) -> page texts
+- "pdftotext" / "pdftotext-layout": poppler's native extractor (the
+  same poppler build pdf2image uses), far faster than pure Python on
+  long discharge summaries
+- "pypdf": pure-Python fallback, always available
+- A benchmark that picks the backend for this deployment and saves the
+  choice
+
+NOTE
+----
+Selection order: PDF_TEXT_BACKEND env var, then the benchmark's saved
+choice (data/text_backend.json), then "pypdf". A backend that fails on
+a document falls back to pypdf for that document.
+
+Benchmark (run once per deployment, on representative digital reports):
+
+    python -m backend.text_layer reports/*.pdf
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from pypdf import PdfReader
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+POPPLER_DIR = BASE_DIR / "bin" / "poppler"
+CHOICE_PATH = Path(os.getenv("PDF_TEXT_BACKEND_FILE", BASE_DIR / "data" / "text_backend.json"))
+
+DEFAULT_BACKEND = "pypdf"
+PDFTOTEXT_TIMEOUT = 60
+
+
+class TextBackend(NamedTuple):
+    name: str
+    extract: Callable[[bytes], List[str]]   # pdf bytes -> text per page
+    available: Callable[[], bool]
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+def _pypdf_pages(pdf_bytes: bytes) -> List[str]:
+    reader = PdfReader(BytesIO(pdf_bytes))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def _pdftotext_cmd() -> Optional[str]:
+    bundled = POPPLER_DIR / "pdftotext"
+    if bundled.exists():
+        return str(bundled)
+    return shutil.which("pdftotext")
+
+
+def _pdftotext_pages(pdf_bytes: bytes, layout: bool = False) -> List[str]:
+    cmd = _pdftotext_cmd()
+    if cmd is None:
+        raise FileNotFoundError("pdftotext not found")
+
+    # Older poppler builds cannot read the PDF from stdin
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf_bytes)
+
+        args = [cmd, "-q", "-enc", "UTF-8"]
+        if layout:
+            args.append("-layout")
+
+        out = subprocess.run(
+            args + [path, "-"],
+            capture_output=True,
+            timeout=PDFTOTEXT_TIMEOUT,
+            check=True
+        ).stdout
+
+    # Pages end with a form feed
+    pages = out.decode("utf-8", errors="replace").split("\f")
+    if pages and not pages[-1].strip():
+        pages.pop()
+    return pages
+
+
+BACKENDS: Dict[str, TextBackend] = {
+    "pdftotext": TextBackend(
+        "pdftotext",
+        _pdftotext_pages,
+        lambda: _pdftotext_cmd() is not None
+    ),
+    "pdftotext-layout": TextBackend(
+        "pdftotext-layout",
+        lambda data: _pdftotext_pages(data, layout=True),
+        lambda: _pdftotext_cmd() is not None
+    ),
+    "pypdf": TextBackend("pypdf", _pypdf_pages, lambda: True)
+}
+
+
+# =====================================================
+# SELECTION
+# =====================================================
+_SELECTED: Optional[TextBackend] = None
+
+
+def _saved_choice() -> Optional[str]:
+    try:
+        return json.loads(CHOICE_PATH.read_text(encoding="utf-8")).get("backend")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_backend() -> TextBackend:
+    """
+    Backend for this deployment (resolved once per process).
+    """
+    global _SELECTED
+
+    if _SELECTED is None:
+        name = os.getenv("PDF_TEXT_BACKEND") or _saved_choice() or DEFAULT_BACKEND
+        backend = BACKENDS.get(name)
+
+        if backend is None or not backend.available():
+            backend = BACKENDS[DEFAULT_BACKEND]
+        _SELECTED = backend
+
+    return _SELECTED
+
+
+def extract_pages(pdf_bytes: bytes, backend: Optional[TextBackend] = None) -> List[str]:
+    """
+    Text per page with the selected backend, pypdf if that fails.
+    """
+    backend = backend or get_backend()
+
+    try:
+        return backend.extract(pdf_bytes)
+    except Exception:
+        if backend.name == DEFAULT_BACKEND:
+            raise
+        return BACKENDS[DEFAULT_BACKEND].extract(pdf_bytes)
+
+
+# =====================================================
+# BENCHMARK
+# =====================================================
+def _fields(text: str) -> Dict:
+    from backend.pipeline import analyse_text
+    return analyse_text(text).details
+
+
+def benchmark(samples: List[bytes], repeat: int = 3) -> Dict[str, Dict]:
+    """
+    Time every available backend on `samples`.
+
+    A backend only qualifies when the fields extracted from its text
+    match pypdf's on every sample (same details, not just any text).
+    """
+    reference = [_fields("\n".join(_pypdf_pages(s))) for s in samples]
+    results: Dict[str, Dict] = {}
+
+    for name, backend in BACKENDS.items():
+        if not backend.available():
+            continue
+
+        try:
+            texts = [backend.extract(s) for s in samples]
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for s in samples:
+                    backend.extract(s)
+            seconds = (time.perf_counter() - start) / repeat
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+
+        agree = sum(
+            _fields("\n".join(pages)) == ref
+            for pages, ref in zip(texts, reference)
+        )
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "fields_agree": agree,
+            "qualified": agree == len(samples)
+        }
+
+    return results
+
+
+def pick_backend(results: Dict[str, Dict]) -> str:
+    qualified = [
+        (r["seconds"], name) for name, r in results.items()
+        if r.get("qualified")
+    ]
+    return min(qualified)[1] if qualified else DEFAULT_BACKEND
+
+
+def main(paths: List[str]) -> None:
+    samples = [Path(p).read_bytes() for p in paths]
+    if not samples:
+        sys.exit("usage: python -m backend.text_layer REPORT.pdf [...]")
+
+    results = benchmark(samples)
+    choice = pick_backend(results)
+
+    CHOICE_PATH.write_text(json.dumps({
+        "backend": choice,
+        "samples": len(samples),
+        "results": results
+    }, indent=2), encoding="utf-8")
+
+    for name, r in results.items():
+        print(f"{name:18} {r}")
+    print(f"selected: {choice} -> {CHOICE_PATH}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
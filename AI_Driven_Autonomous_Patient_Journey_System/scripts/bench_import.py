@@ -0,0 +1,122 @@
+"""
+bench_import.py
+
+ROLE
+----
+Import-time guard for the backend.
+
+PURPOSE
+-------
+- Import each entry-point module in a fresh interpreter and time it
+- Fail when a module pulls in a heavy dependency it should load lazily
+  (Streamlit, OCR, PDF, DOCX and HTTP client libraries) or exceeds its
+  time budget
+
+NOTE
+----
+Run from the project root; exits non-zero on any regression:
+
+    python scripts/bench_import.py            # check
+    python scripts/bench_import.py --repeat 9 # steadier timings
+
+Budgets are generous (cold start on a slow CI runner); the forbidden
+module lists are the real guard.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Never imported by the backend at module load
+HEAVY = (
+    "streamlit",
+    "pytesseract",
+    "pdf2image",
+    "pypdf",
+    "pdfplumber",
+    "docx",
+    "groq",
+    "requests",
+    "http.server"
+)
+
+
+class Check(NamedTuple):
+    module: str
+    budget_ms: float
+    forbidden: Tuple[str, ...]
+
+
+CHECKS: List[Check] = [
+    Check("backend.settings", 50, HEAVY),
+    Check("backend.telemetry", 50, HEAVY),
+    Check("backend.preflight", 50, HEAVY),
+    Check("backend.llm_client", 100, HEAVY),
+    Check("backend.planner", 250, HEAVY),
+    Check("backend.extractor", 300, HEAVY + ("PIL", "backend.layout")),
+    Check("backend.api", 400, HEAVY + ("reportlab",))
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str) -> Dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(repeat: int) -> bool:
+    ok = True
+
+    for check in CHECKS:
+        try:
+            runs = [measure(check.module) for _ in range(repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"FAIL {check.module}: import error\n{e.stderr}")
+            ok = False
+            continue
+
+        ms = statistics.median(r["seconds"] for r in runs) * 1000
+        loaded = set(runs[0]["modules"])
+        leaked = [m for m in check.forbidden if m in loaded]
+
+        status = "ok"
+        if leaked:
+            status = f"FAIL imports {', '.join(leaked)}"
+        elif ms > check.budget_ms:
+            status = f"FAIL over budget ({check.budget_ms:.0f} ms)"
+        ok = ok and status == "ok"
+
+        print(f"{check.module:22} {ms:7.1f} ms  {status}")
+
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.repeat) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+loadtest.py
+
+ROLE
+----
+Concurrent-session load generator for one node.
+
+PURPOSE
+-------
+- Drive the full pipeline the UI runs per upload:
+  process_diagnosis_report -> generate_full_care_plan ->
+  build_treatment_plan_pdf, from N simulated sessions (threads, as
+  Streamlit serves sessions)
+- Point the planner at a local Groq mock (scripts/mock_groq.py) with
+  configurable latency and error rate, or at any URL
+- Report throughput, latency percentiles per stage, queue depth
+  (sessions inside each stage) and process memory
+
+NOTE
+----
+Run from the project root, e.g.
+
+    python scripts/loadtest.py --sessions 16 --duration 60 --latency 1.0
+    python scripts/loadtest.py --sessions 8 --reports samples/*.pdf --json out.json
+
+Without --reports a synthetic two-page digital report is used. Exits
+non-zero when --max-error-rate is exceeded.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from mock_groq import MockConfig, mock_url, start_mock  # noqa: E402
+
+STAGES = ("extract", "plan", "pdf")
+SAMPLE_EVERY = 0.1
+
+
+# =====================================================
+# INPUTS
+# =====================================================
+SAMPLE_LINES = [
+    "CITY GENERAL HOSPITAL - DISCHARGE SUMMARY",
+    "Patient Name: Ravi Kumar",
+    "Age: 58 Years",
+    "Gender: Male",
+    "Chief Complaint: Chest pain and breathlessness on exertion",
+    "Diagnosis: Type 2 Diabetes Mellitus with Hypertension",
+    "Hemoglobin: 12.1 g/dL",
+    "Fasting Blood Sugar: 168 mg/dL",
+    "HbA1c: 8.2 %",
+    "Serum Creatinine: 1.1 mg/dL"
+]
+
+
+def sample_report() -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(2):
+        y = 800
+        for line in SAMPLE_LINES + [f"Clinical note {page}.{i}: stable, reviewed." for i in range(25)]:
+            pdf.drawString(50, y, line)
+            y -= 18
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.completed = 0
+        self.in_stage: Counter = Counter()
+        self.depth: Dict[str, List[int]] = defaultdict(list)
+        self.rss: List[float] = []
+
+    def enter(self, stage: str) -> None:
+        with self.lock:
+            self.in_stage[stage] += 1
+
+    def leave(self, stage: str, seconds: float, error: Optional[str] = None) -> None:
+        with self.lock:
+            self.in_stage[stage] -= 1
+            if error is None:
+                self.latency[stage].append(seconds)
+            else:
+                self.errors[f"{stage}:{error}"] += 1
+
+    def sample(self) -> None:
+        with self.lock:
+            for stage in STAGES:
+                self.depth[stage].append(self.in_stage[stage])
+        self.rss.append(rss_mb())
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # Peak, not current, off Linux (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# =====================================================
+# SESSIONS
+# =====================================================
+def run_session(
+    reports: List[bytes],
+    rec: Recorder,
+    stop: threading.Event,
+    iterations: int,
+    think: float,
+    workdir: str,
+    session_id: int
+) -> None:
+    from backend.extractor import process_diagnosis_report
+    from backend.pdf_builder import build_treatment_plan_pdf
+    from backend.planner import generate_full_care_plan
+
+    done = 0
+    while not stop.is_set() and (not iterations or done < iterations):
+        report = reports[(session_id + done) % len(reports)]
+        done += 1
+        start = time.perf_counter()
+
+        steps = (
+            ("extract", lambda: process_diagnosis_report(report)),
+            ("plan", lambda: generate_full_care_plan(result["details"], result["summary_data"])),
+            ("pdf", lambda: build_treatment_plan_pdf(
+                result["details"], result["summary_data"], plan,
+                os.path.join(workdir, f"session{session_id}.pdf")
+            ))
+        )
+
+        result: Dict = {}
+        plan: Dict = {}
+        failed = False
+
+        for stage, step in steps:
+            rec.enter(stage)
+            t0 = time.perf_counter()
+            try:
+                value = step()
+            except Exception as e:
+                rec.leave(stage, 0.0, type(e).__name__)
+                failed = True
+                break
+            rec.leave(stage, time.perf_counter() - t0)
+
+            if stage == "extract":
+                result = value
+            elif stage == "plan":
+                plan = value
+
+        if not failed:
+            with rec.lock:
+                rec.latency["end_to_end"].append(time.perf_counter() - start)
+                rec.completed += 1
+
+        if think:
+            stop.wait(think)
+
+
+def run(args) -> Dict:
+    reports = [Path(p).read_bytes() for p in args.reports] or [sample_report()]
+
+    mock = None
+    if args.url:
+        os.environ["GROQ_API_URL"] = args.url
+    else:
+        mock = start_mock(0, MockConfig(args.latency, args.jitter, args.error_rate))
+        os.environ["GROQ_API_URL"] = mock_url(mock)
+        if not os.environ.get("GROQ_API_KEY"):
+            os.environ["GROQ_API_KEY"] = "loadtest"
+
+    rec = Recorder()
+    stop = threading.Event()
+    rss_start = rss_mb()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sessions = [
+            threading.Thread(
+                target=run_session,
+                args=(reports, rec, stop, args.iterations, args.think, workdir, i),
+                name=f"session-{i}",
+                daemon=True
+            )
+            for i in range(args.sessions)
+        ]
+
+        start = time.perf_counter()
+        for s in sessions:
+            s.start()
+
+        deadline = start + args.duration if args.duration else None
+        while any(s.is_alive() for s in sessions):
+            rec.sample()
+            if deadline and time.perf_counter() >= deadline:
+                stop.set()
+            time.sleep(SAMPLE_EVERY)
+
+        elapsed = time.perf_counter() - start
+
+    attempts = rec.completed + sum(rec.errors.values())
+
+    return {
+        "sessions": args.sessions,
+        "elapsed_s": round(elapsed, 2),
+        "completed": rec.completed,
+        "errors": dict(rec.errors),
+        "error_rate": round(sum(rec.errors.values()) / attempts, 4) if attempts else 0.0,
+        "throughput_per_s": round(rec.completed / elapsed, 3) if elapsed else 0.0,
+        "latency_s": {
+            stage: {
+                "n": len(values),
+                **{f"p{q}": round(percentile(values, q), 4) for q in (50, 90, 95, 99)},
+                "max": round(max(values), 4) if values else None
+            }
+            for stage, values in rec.latency.items()
+        },
+        "queue_depth": {
+            stage: {
+                "mean": round(sum(d) / len(d), 2) if d else 0.0,
+                "max": max(d) if d else 0
+            }
+            for stage, d in rec.depth.items()
+        },
+        "memory_mb": {
+            "start": round(rss_start, 1),
+            "peak": round(max(rec.rss, default=rss_start), 1),
+            "end": round(rss_mb(), 1)
+        },
+        "mock": None if mock is None else {
+            "requests": mock.config.requests,
+            "injected_errors": mock.config.errors
+        }
+    }
+
+
+def print_report(r: Dict) -> None:
+    print(f"sessions {r['sessions']}  elapsed {r['elapsed_s']} s  "
+          f"completed {r['completed']}  throughput {r['throughput_per_s']}/s  "
+          f"errors {r['error_rate']:.1%}")
+
+    print(f"\n{'stage':12} {'n':>6} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for stage, s in r["latency_s"].items():
+        print(f"{stage:12} {s['n']:6d} " + " ".join(
+            f"{s[k]:8.3f}" if s[k] is not None else f"{'-':>8}"
+            for k in ("p50", "p90", "p95", "p99", "max")
+        ))
+
+    print("\nqueue depth (sessions in stage): " + "  ".join(
+        f"{stage} mean {d['mean']} max {d['max']}" for stage, d in r["queue_depth"].items()
+    ))
+    m = r["memory_mb"]
+    print(f"memory RSS MB: start {m['start']}  peak {m['peak']}  end {m['end']}")
+
+    if r["errors"]:
+        print("errors: " + ", ".join(f"{k} x{v}" for k, v in sorted(r["errors"].items())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent-session pipeline load test")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds (0 = until --iterations)")
+    parser.add_argument("--iterations", type=int, default=0, help="uploads per session (0 = until --duration)")
+    parser.add_argument("--think", type=float, default=0.0, help="pause between uploads (s)")
+    parser.add_argument("--reports", nargs="*", default=[], help="report files to upload")
+    parser.add_argument("--url", help="real chat-completions URL instead of the mock")
+    parser.add_argument("--latency", type=float, default=0.8, help="mock mean latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="mock latency std-dev (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock error share")
+    parser.add_argument("--max-error-rate", type=float, default=1.0, help="fail above this share")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    if not args.duration and not args.iterations:
+        parser.error("set --duration or --iterations")
+
+    results = run(args)
+    print_report(results)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    sys.exit(1 if results["error_rate"] > args.max_error_rate else 0)
+
+
+if __name__ == "__main__":
+    main()
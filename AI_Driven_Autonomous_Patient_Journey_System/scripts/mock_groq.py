@@ -0,0 +1,171 @@
+"""
+mock_groq.py
+
+ROLE
+----
+Local stand-in for Groq's OpenAI-compatible chat-completions endpoint.
+
+PURPOSE
+-------
+- Let load tests exercise the planner without network, quota or cost
+- Configurable latency (mean + jitter) and error rate (HTTP 500 / 429)
+- Return a realistic treatment-plan answer with token usage
+
+NOTE
+----
+Point the planner at it with GROQ_API_URL (see backend/settings.py):
+
+    python scripts/mock_groq.py --port 8800 --latency 1.2 --error-rate 0.02
+    GROQ_API_URL=http://127.0.0.1:8800/openai/v1/chat/completions ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+CHAT_PATH = "/openai/v1/chat/completions"
+
+PLAN_TEXT = """1. Clinical assessment
+- Findings are consistent with the identified condition
+2. Treatment goals
+- Symptom control and prevention of complications
+3. Medications (general categories only)
+- First-line agents as per current guidelines
+4. Monitoring and investigations
+- Repeat relevant laboratory tests in 4-6 weeks
+5. Lifestyle and patient advice
+- Balanced diet, regular exercise, adherence to treatment
+6. Follow-up and referral plan
+- Review in 2 weeks; specialist referral if no improvement
+7. Estimated treatment cost range in INR
+- 5,000 - 15,000
+"""
+
+
+class MockConfig:
+    def __init__(self, latency: float = 0.8, jitter: float = 0.3, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def draw(self):
+        """
+        (delay seconds, error status or None) for one request.
+        """
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter))
+            status = None
+            if self.rng.random() < self.error_rate:
+                status = self.rng.choice((500, 429))
+                self.errors += 1
+        return delay, status
+
+
+def _completion(body: Dict) -> Dict:
+    prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+    return {
+        "id": f"mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": PLAN_TEXT},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            # ~4 characters per token
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(PLAN_TEXT) // 4,
+            "total_tokens": (len(prompt) + len(PLAN_TEXT)) // 4
+        }
+    }
+
+
+def _handler(config: MockConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+
+            if self.path != CHAT_PATH:
+                self._reply(404, {"error": {"message": "Not found"}})
+                return
+
+            delay, status = config.draw()
+            time.sleep(delay)
+
+            if status is not None:
+                self._reply(status, {"error": {"message": f"mock error {status}"}})
+                return
+
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                self._reply(400, {"error": {"message": "invalid JSON"}})
+                return
+
+            self._reply(200, _completion(body))
+
+        def _reply(self, status: int, data: Dict) -> None:
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+
+def start_mock(port: int = 0, config: Optional[MockConfig] = None) -> ThreadingHTTPServer:
+    """
+    Serve the mock from a daemon thread; port 0 picks a free port
+    (read it back from server.server_address).
+    """
+    config = config or MockConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(config))
+    server.daemon_threads = True
+    server.config = config
+
+    threading.Thread(target=server.serve_forever, name="mock-groq", daemon=True).start()
+    return server
+
+
+def mock_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{CHAT_PATH}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock Groq chat-completions server")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.8, help="mean seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.3, help="latency std-dev (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500/429 replies")
+    args = parser.parse_args()
+
+    server = start_mock(args.port, MockConfig(args.latency, args.jitter, args.error_rate))
+    print(f"mock Groq at {mock_url(server)}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import api
+
+SECRET = "Ravi Kumar /home/reports/ravi.pdf"
+
+# Single blank page: a valid, tiny, scanned-looking PDF
+BLANK_PDF = (
+    b"%PDF-1.4\n"
+    b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+    b"2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n"
+    b"3 0 obj\n<< /Type /Page /Parent 2 0 R >>\nendobj\n"
+    b"trailer\n<< /Root 1 0 R >>\n%%EOF\n"
+)
+
+
+def call(method, path, body=b"", content_type="application/pdf", chunk=None, held=None):
+    """
+    Drive the ASGI app with fake receive/send; returns (status, headers, body).
+    """
+    chunk = chunk or max(len(body), 1)
+    pieces = [body[i:i + chunk] for i in range(0, len(body), chunk)] or [b""]
+    queue = [
+        {"type": "http.request", "body": p, "more_body": i < len(pieces) - 1}
+        for i, p in enumerate(pieces)
+    ]
+    sent = []
+
+    async def receive():
+        return queue.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"content-type", content_type.encode("latin-1"))]
+        }
+        if held is None:
+            await api.app(scope, receive, send)
+            return
+        async with api._semaphore(held):
+            await api.app(scope, receive, send)
+
+    asyncio.run(run())
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]
+
+
+@pytest.fixture(autouse=True)
+def fresh_api(monkeypatch):
+    # Semaphores are per event loop; extraction runs in threads, not processes
+    monkeypatch.setattr(api, "_SEMAPHORES", {})
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(api, "_ocr_pool", lambda: pool)
+    yield
+    pool.shutdown(wait=True)
+
+
+def test_upload_over_the_size_cap_is_413(monkeypatch):
+    monkeypatch.setattr(api, "MAX_UPLOAD_BYTES", 1024)
+    status, _, body = call("POST", "/extract", BLANK_PDF * 20, chunk=256)
+    assert status == 413
+    assert "error" in json.loads(body)
+
+
+def test_busy_endpoint_is_429(monkeypatch):
+    monkeypatch.setitem(api.LIMITS, "extract", 1)
+    status, headers, _ = call("POST", "/extract", BLANK_PDF, held="extract")
+    assert status == 429
+    assert headers[b"retry-after"] == b"1"
+
+
+@pytest.mark.parametrize("body, status", [
+    (b"", 400),
+    (b"plain text, not a report", 415),
+    (BLANK_PDF[:-7], 422),
+])
+def test_preflight_rejections_map_to_statuses(body, status):
+    assert call("POST", "/extract", body)[0] == status
+
+
+def test_multipart_upload(monkeypatch):
+    seen = []
+
+    def process(data, layout, roi):
+        seen.append(data)
+        return {"details": {}, "summary_data": {}, "raw_text": ""}
+
+    monkeypatch.setattr(api, "process_diagnosis_report", process)
+
+    boundary = "report-boundary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + BLANK_PDF + f"\r\n--{boundary}--\r\n".encode()
+
+    status, _, _ = call("POST", "/extract", body, f"multipart/form-data; boundary={boundary}")
+    assert status == 200
+    assert seen == [BLANK_PDF]
+
+
+def test_error_bodies_carry_no_exception_text(monkeypatch):
+    def fail(*args):
+        raise RuntimeError(SECRET)
+
+    monkeypatch.setattr(api, "process_diagnosis_report", fail)
+    status, _, body = call("POST", "/extract", BLANK_PDF)
+    assert status == 500
+    assert SECRET not in body.decode()
+    assert json.loads(body)["error_id"]
+
+    monkeypatch.setattr(api, "generate_full_care_plan", fail)
+    status, _, body = call("POST", "/care-plan", b'{"summary": {}}', "application/json")
+    assert status == 502
+    assert SECRET not in body.decode()
+
+
+def test_trailing_slash_with_the_wrong_method_is_405():
+    assert call("GET", "/extract/")[0] == 405
+    assert call("GET", "/extract")[0] == 405
+    assert call("GET", "/missing/")[0] == 404
+    assert call("GET", "/healthz/")[0] == 200
@@ -0,0 +1,53 @@
+from backend.journey_store import JourneyRecord, JourneyStore, identity_key
+
+
+def _record(key, **details):
+    extraction = {
+        "details": {"name": "Ravi Kumar", "gender": "Male", **details},
+        "summary_data": {"report_type": "lab", "final_diagnosis": key},
+        "raw_text": ""
+    }
+    return JourneyRecord(key, "pdf", extraction, {"identified_problem": key})
+
+
+def test_same_name_and_gender_is_not_identity(tmp_path):
+    store = JourneyStore(tmp_path / "journey.sqlite")
+    store.record(_record("older", age="58"))
+    store.record(_record("younger", age="23"))
+
+    assert identity_key({"name": "Ravi Kumar", "gender": "Male"}) is None
+    assert store.history_for({"name": "Ravi Kumar", "gender": "Male"}) == []
+
+
+def test_reports_link_by_record_number(tmp_path):
+    store = JourneyStore(tmp_path / "journey.sqlite")
+    store.record(_record("first", age="58", patient_id="UH-1001"))
+    store.record(_record("second", age="59", patient_id="uh1001"))
+    store.record(_record("other", age="23", patient_id="UH-2002"))
+
+    history = store.history_for({"patient_id": "UH-1001"})
+    assert sorted(e.upload_key for e in history) == ["first", "second"]
+
+
+def test_reports_link_by_name_and_date_of_birth(tmp_path):
+    store = JourneyStore(tmp_path / "journey.sqlite")
+    store.record(_record("first", dob="12/04/1966"))
+    store.record(_record("second", dob="12-04-1966"))
+    store.record(_record("other", dob="01/01/2001"))
+
+    history = store.history_for({"name": "Ravi Kumar", "dob": "12.04.1966"})
+    assert sorted(e.upload_key for e in history) == ["first", "second"]
+
+
+def test_doctor_registration_number_is_not_a_patient_id(tmp_path):
+    from backend.pipeline import analyse_text
+
+    store = JourneyStore(tmp_path / "journey.sqlite")
+    signature = "\nDiagnosis: Hypertension\nDr. A Sharma, MD\nReg No: 45678"
+
+    for key, name in (("first", "Ravi Kumar"), ("second", "Anil Mehta")):
+        ctx = analyse_text(f"Patient Name: {name}\nAge: 50\nGender: Male{signature}")
+        assert ctx.details["patient_id"] == "Not mentioned"
+        store.record(JourneyRecord(key, "pdf", {"details": ctx.details, "summary_data": ctx.summary}, {}))
+
+    assert store.history_for({"patient_id": "45678"}) == []
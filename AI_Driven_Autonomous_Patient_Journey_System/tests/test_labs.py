@@ -0,0 +1,26 @@
+from backend.labs import extract_lab_panel
+
+
+def _record(text):
+    (record,) = extract_lab_panel(text).to_records()
+    return record
+
+
+def test_alternative_unit_is_converted():
+    record = _record("Fasting Glucose: 6.1 mmol/L")
+    assert record["unit"] == "mg/dL"
+    assert round(record["value"], 1) == 109.9
+    assert record["flag"] == "High"
+
+
+def test_missing_unit_is_the_canonical_unit():
+    record = _record("Fasting Glucose: 92")
+    assert (record["value"], record["unit"], record["flag"]) == (92.0, "mg/dL", "Normal")
+
+
+def test_unknown_unit_is_kept_and_not_flagged():
+    record = _record("HbA1c: 48 mmol/mol")
+    assert (record["value"], record["unit"], record["flag"]) == (48.0, "mmol/mol", "")
+
+    record = _record("Fasting Glucose: 6.1 mmol")
+    assert (record["value"], record["unit"], record["flag"]) == (6.1, "mmol", "")
@@ -0,0 +1,18 @@
+from backend.layout import DocumentLayout, Row, Word
+
+
+def _row(top, *cells):
+    return Row(0, tuple(Word(text, x, x + 10, top) for x, text in cells))
+
+
+def test_hits_start_at_their_offset_in_the_text():
+    layout = DocumentLayout([
+        _row(0, (0, "Report"), (20, "Header")),
+        _row(10, (0, "Chief"), (11, "Complaint:"), (41, "Cough")),
+        _row(20, (0, "Hemoglobin"), (100, "12.1"), (130, "g/dL")),
+    ])
+    hits = layout.field_hits()
+
+    assert layout.text[hits["chief_complaint"].start:].startswith("Chief Complaint:")
+    assert layout.text[hits["lab:hemoglobin"].start:].startswith("Hemoglobin 12.1")
+    assert layout.text is layout.text
@@ -0,0 +1,20 @@
+import random
+
+from backend.near_dup import TEXT, Fingerprint, NearDuplicateIndex
+
+# Far apart: no two within MAX_DISTANCE
+VALUES = [random.Random(i).getrandbits(64) for i in range(5)]
+
+
+def test_index_keeps_the_newest_reports(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "near_dup.sqlite", max_entries=3)
+    for i in range(5):
+        index.add(f"upload-{i}", Fingerprint(TEXT, VALUES[i]), {}, {})
+
+    assert index.evict() == 2
+    assert len(index) == 3
+    bands = index._conn().execute("SELECT COUNT(DISTINCT fingerprint_id) FROM bands").fetchone()[0]
+    assert bands == 3
+
+    assert index.nearest(Fingerprint(TEXT, VALUES[0])) is None
+    assert index.nearest(Fingerprint(TEXT, VALUES[4])).upload_key == "upload-4"
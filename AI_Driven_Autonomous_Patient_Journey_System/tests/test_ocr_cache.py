@@ -0,0 +1,61 @@
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.ocr_cache import OCRCache, cached_ocr, content_key
+from backend.ocr_preprocess import prepare_page
+
+
+def _page(value: str) -> Image.Image:
+    # A4 at 300 dpi, one lab line; only the value changes between pages
+    img = Image.new("L", (2480, 3508), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=48)
+    draw.text((200, 300), "CITY GENERAL HOSPITAL - LAB REPORT", fill=0, font=font)
+    draw.text((200, 500), f"Fasting Glucose {value} mg/dL", fill=0, font=font)
+    return prepare_page(img).image
+
+
+def test_one_digit_changes_the_key():
+    for a, b in (("110", "116"), ("5.8", "9.8"), ("110", "118")):
+        assert content_key(_page(a)) != content_key(_page(b))
+
+
+def test_similar_pages_do_not_share_text(tmp_path, monkeypatch):
+    cache = OCRCache(tmp_path / "ocr.sqlite")
+    monkeypatch.setattr("backend.ocr_cache.get_cache", lambda: cache)
+
+    first, second = _page("110"), _page("116")
+    calls = []
+
+    def ocr(image):
+        calls.append(image)
+        return "110" if image is first else "116"
+
+    assert cached_ocr(first, ocr) == "110"
+    assert cached_ocr(second, ocr) == "116"
+    assert len(calls) == 2
+
+    # Byte-identical page: served from the cache
+    assert cached_ocr(_page("110"), ocr) == "110"
+    assert len(calls) == 2
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = OCRCache(tmp_path / "ocr.sqlite")
+    key = content_key(_page("110"))
+    cache.put(key, "text")
+
+    assert cache.get(key) == "text"
+    hits = cache._conn().execute("SELECT hits FROM ocr_pages").fetchone()[0]
+    assert hits == 0
+
+    cache.flush()
+    hits = cache._conn().execute("SELECT hits FROM ocr_pages").fetchone()[0]
+    assert hits == 1
+
+
+def test_only_the_key_and_text_are_stored(tmp_path):
+    cache = OCRCache(tmp_path / "ocr.sqlite")
+    cache.put(content_key(_page("110")), "text")
+
+    columns = [row[1] for row in cache._conn().execute("PRAGMA table_info(ocr_pages)")]
+    assert columns == ["key", "text", "created", "last_used", "hits"]
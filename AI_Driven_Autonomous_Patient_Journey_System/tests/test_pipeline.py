@@ -0,0 +1,30 @@
+from backend.pipeline import NO_DIAGNOSIS, ReportPipeline, extract_diagnosis
+
+SAMPLE = "\n".join([
+    "CITY GENERAL HOSPITAL - DISCHARGE SUMMARY",
+    "Patient Name: Ravi Kumar",
+    "Age: 58 Years",
+    "Gender: Male",
+    "Chief Complaint: Chest pain and breathlessness on exertion",
+    "Diagnosis: Type 2 Diabetes Mellitus with Hypertension",
+    "Hemoglobin: 12.1 g/dL",
+    "Fasting Blood Sugar: 168 mg/dL",
+])
+
+
+def test_inline_diagnosis_wins_over_the_next_line():
+    summary = ReportPipeline().run(SAMPLE).summary
+    assert summary["final_diagnosis"] == "Type 2 Diabetes Mellitus with Hypertension"
+
+
+def test_next_line_only_under_a_bare_heading():
+    text = "Final Diagnosis:\nCommunity acquired pneumonia\nHemoglobin: 12.1 g/dL"
+    assert extract_diagnosis(text) == "Community acquired pneumonia"
+
+    text = "Diagnosis:\nLab results pending"
+    assert extract_diagnosis(text) == NO_DIAGNOSIS
+
+
+def test_separator_is_not_the_value():
+    assert extract_diagnosis("IMPRESSION:\nNo acute disease") == "No acute disease"
+    assert extract_diagnosis("Final Diagnosis - Acute MI") == "Acute MI"
@@ -0,0 +1,66 @@
+import zlib
+
+from backend.preflight import ACCEPT, count_pdf_pages, has_text_layer, preflight
+
+
+def _pdf(*objects):
+    body = b"%PDF-1.5\n"
+    for number, obj in enumerate(objects, 1):
+        body += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    return body + b"trailer\n<< /Root 1 0 R >>\n%%EOF\n"
+
+
+def _object_stream(content):
+    data = zlib.compress(content)
+    return (
+        b"<< /Type /ObjStm /N 1 /First 4 /Filter /FlateDecode /Length %d >>\nstream\n" % len(data)
+        + data + b"\nendstream"
+    )
+
+
+def test_outline_count_is_not_the_page_count():
+    data = _pdf(
+        b"<< /Type /Catalog /Pages 2 0 R /Outlines 3 0 R >>",
+        b"<< /Type /Pages /Kids [4 0 R 5 0 R] /Count 2 >>",
+        b"<< /Type /Outlines /Count 40 >>",
+        b"<< /Type /Page /Parent 2 0 R >>",
+        b"<< /Type /Page /Parent 2 0 R >>",
+    )
+    assert count_pdf_pages(data) == 2
+
+
+def test_only_the_root_pages_node_is_read():
+    data = _pdf(
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 7 >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [] /Count 3 >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [] /Count 4 >>",
+    )
+    assert count_pdf_pages(data) == 7
+
+
+def test_fonts_in_object_streams_are_a_text_layer():
+    fonts = b"6 0 << /Font << /F1 7 0 R >> >>"
+    data = _pdf(
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /Resources 6 0 R >>",
+        _object_stream(fonts),
+    )
+    assert b"/Font" not in data
+    assert has_text_layer(data)
+
+    result = preflight(data)
+    assert result.has_text_layer and result.ocr_seconds == 0.0
+    assert result.decision == ACCEPT
+
+
+def test_scanned_pdf_has_no_text_layer():
+    data = _pdf(
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R >>",
+        _object_stream(b"4 0 << /XObject << /Im1 5 0 R >> >>"),
+    )
+    assert not has_text_layer(data)
+    assert not preflight(data).has_text_layer
@@ -0,0 +1,14 @@
+from backend import profiling
+
+
+def test_pruning_keeps_foreign_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "_KEEP", 2)
+    (tmp_path / "settings.json").write_text("{}")
+
+    for i in range(4):
+        profiling._save({"name": "extract", "started": 1700000000 + i, "elapsed_ms": 10})
+
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert "settings.json" in names
+    assert len(names) == 3
@@ -0,0 +1,20 @@
+from backend.result_store import PipelineResults, ResultStore
+
+
+def test_session_only_results_are_not_shared():
+    shared = ResultStore(8)
+    reusing, other = PipelineResults(shared=shared), PipelineResults(shared=shared)
+
+    assert reusing.get_or_compute("upload", "extraction:reused", lambda: "previous patient", session_only=True) == "previous patient"
+    assert len(shared) == 0
+
+    # Another session analysing the same upload computes its own result
+    assert other.get_or_compute("upload", "extraction", lambda: "fresh") == "fresh"
+    assert reusing.get_or_compute("upload", "extraction:reused", lambda: "recomputed", session_only=True) == "previous patient"
+
+
+def test_fresh_results_are_shared():
+    shared = ResultStore(8)
+    PipelineResults(shared=shared).get_or_compute("upload", "extraction", lambda: "fresh")
+
+    assert PipelineResults(shared=shared).get_or_compute("upload", "extraction", lambda: "again") == "fresh"
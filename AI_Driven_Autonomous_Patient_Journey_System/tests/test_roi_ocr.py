@@ -0,0 +1,43 @@
+from PIL import Image, ImageDraw
+
+from backend.roi_ocr import missing_fields, roi_ocr
+
+HEADER = "Name: Ravi Kumar\nAge: 58\nGender: Male\n"
+
+
+def test_missing_chief_complaint_widens_the_ocr():
+    assert missing_fields(HEADER + "Diagnosis: Hypertension") == ["chief_complaint"]
+
+
+def test_complete_header_and_tail():
+    text = HEADER + "Chief Complaint: Headache\nDiagnosis: Hypertension"
+    assert missing_fields(text) == []
+
+
+RADIOLOGY_TAIL = (
+    "CT Chest with contrast\nFindings: Lungs are clear. No pleural effusion.\n"
+    "Impression: No acute cardiopulmonary process"
+)
+
+
+def test_radiology_report_needs_no_chief_complaint():
+    assert missing_fields(HEADER + RADIOLOGY_TAIL) == []
+
+
+def test_radiology_report_stays_at_the_roi_tier():
+    page = Image.new("L", (1240, 1754), 255)
+    draw = ImageDraw.Draw(page)
+    draw.rectangle((100, 100, 1100, 300), fill=0)
+    draw.rectangle((100, 1400, 1100, 1600), fill=0)
+
+    regions = iter([HEADER, RADIOLOGY_TAIL])
+    calls = []
+
+    def ocr(image, page_no):
+        calls.append(page_no)
+        return next(regions)
+
+    text, tier = roi_ocr([page], ocr)
+    assert tier == "roi"
+    assert calls == [0, 0]
+    assert "No acute cardiopulmonary process" in text
@@ -0,0 +1,39 @@
+import pytest
+
+from backend.protocols import get_library
+from backend.router import LARGE, RULES, SMALL, route_case
+
+
+def _route(diagnosis: str):
+    return route_case({"final_diagnosis": diagnosis, "report_confidence": 1.0}, get_library())
+
+
+@pytest.mark.parametrize("diagnosis, protocol", [
+    ("Hypertension", "hypertension"),
+    ("hypertension.", "hypertension"),
+    ("Diabetes Mellitus", "diabetes"),
+    ("STEMI", "acute_coronary_syndrome"),
+])
+def test_plain_condition_takes_the_rule_engine(diagnosis, protocol):
+    route = _route(diagnosis)
+    assert route.tier == RULES
+    assert route.protocols == (protocol,)
+
+
+@pytest.mark.parametrize("diagnosis, reason", [
+    ("Myocardial infarction ruled out", "negated"),
+    ("No evidence of hypertension", "negated"),
+    ("Pregnancy induced hypertension", "qualified_match"),
+    ("Pulmonary hypertension", "qualified_match"),
+    ("Diabetes Insipidus", "qualified_match"),
+    ("Type 1 Diabetes", "qualified_match"),
+])
+def test_negated_or_qualified_condition_goes_to_the_model(diagnosis, reason):
+    route = _route(diagnosis)
+    assert route.tier == SMALL
+    assert route.model is not None
+    assert route.reason == reason
+
+
+def test_co_existing_conditions_go_to_the_large_model():
+    assert _route("Type 2 Diabetes Mellitus with Hypertension").tier == LARGE
@@ -1,8 +1,18 @@
+import time
+
 import streamlit as st
 
 from backend.extractor import process_diagnosis_report   # 🔧 CHANGED
+from backend.journey_store import JourneyRecord, patient_history, record_upload
+from backend.near_dup import find_duplicate, fingerprint, remember
 from backend.planner import generate_full_care_plan
-from backend.pdf_builder import build_treatment_plan_pdf
+from backend.pdf_builder import DEFAULT_FILENAME, prerender_treatment_plan_pdf, rendered_pdf
+from backend.preflight import QUEUE, PreflightError, preflight
+from backend.protocols import start_protocol_watcher
+from backend.result_store import PipelineResults, upload_key as hash_upload
+
+# Protocol edits are picked up without a restart (once per process)
+start_protocol_watcher()
 
 # -------------------------------------------------
 # PAGE CONFIG
@@ -116,7 +126,7 @@ st.markdown('<div class="section-header">Upload Diagnosis Report</div>', unsafe_
 
 st.markdown("""
 <div class="info-panel">
-    Upload a diagnosis or radiology report (PDF or image).
+    Upload a diagnosis or radiology report (PDF, Word document or image).
     The system will extract patient details, detect the report type,
     summarize findings, and generate a treatment plan.
 </div>
@@ -126,8 +136,8 @@ col1, col2 = st.columns([1.2, 1])
 
 with col1:
     uploaded_file = st.file_uploader(
-        "Upload PDF / JPG / PNG",
-        type=["pdf", "jpg", "jpeg", "png"]
+        "Upload PDF / DOCX / JPG / PNG",
+        type=["pdf", "docx", "jpg", "jpeg", "png"]
     )
 
 with col2:
@@ -147,9 +157,84 @@ if not uploaded_file:
 # -------------------------------------------------
 # EXTRACTION
 # -------------------------------------------------
+file_bytes = uploaded_file.getvalue()
+
+# Cheap checks before any OCR: type, size, pages, estimated cost
+try:
+    checked = preflight(file_bytes)
+except PreflightError as e:
+    st.error(str(e))
+    st.stop()
+
+if checked.decision == QUEUE:
+    st.info(
+        f"Scanned report with {checked.pages} page(s): it is queued for OCR "
+        "and may take a few minutes."
+    )
+
+upload_key = hash_upload(file_bytes)
+
+# Per-session store in front of the process-wide one: reruns for the
+# same upload (e.g. the download click) do no OCR and no LLM call
+if "pipeline_results" not in st.session_state:
+    st.session_state["pipeline_results"] = PipelineResults()
+results = st.session_state["pipeline_results"]
+
+# Reuse decision for a near-duplicate: True / False once the user chose
+reuse_key = f"reuse_{upload_key}"
+
+if st.button("🔄 Re-analyze report"):
+    results.invalidate(upload_key)
+    st.session_state[reuse_key] = False
+
+# Re-scan / re-export of a report analysed before: offer its extraction
+# and plan instead of running OCR and the LLM again
+upload_fp = results.get_or_compute(
+    upload_key,
+    "fingerprint",
+    lambda: fingerprint(file_bytes, checked.kind)
+)
+
+match = None
+if st.session_state.get(reuse_key) is not False:
+    match = results.get_or_compute(
+        upload_key,
+        "near_duplicate",
+        lambda: find_duplicate(upload_fp, upload_key)
+    )
+
+if match is not None and reuse_key not in st.session_state:
+    # The index is shared by every session: no patient data from the
+    # earlier report until the user chooses to reuse it
+    analysed = time.strftime("%d %b %Y %H:%M", time.localtime(match.created))
+    st.info(
+        f"This report closely matches one analysed on {analysed} "
+        f"({match.similarity:.0%} similar). Reuse that analysis only if "
+        f"it is the same report of the same patient."
+    )
+    reuse_col, new_col = st.columns(2)
+    if reuse_col.button("♻️ Reuse previous analysis"):
+        st.session_state[reuse_key] = True
+    elif new_col.button("🔬 Analyze as new report"):
+        st.session_state[reuse_key] = False
+    else:
+        st.stop()
+
+reused = match if st.session_state.get(reuse_key) else None
+
+# Reused results are this session's choice: kept under their own stage
+# names and out of the shared store. Only fresh analyses are shared
 with st.spinner("Analyzing medical report..."):
-    file_bytes = uploaded_file.read()
-    extraction = process_diagnosis_report(file_bytes)   # 🔧 CHANGED
+    if reused is not None:
+        extraction = results.get_or_compute(
+            upload_key, "extraction:reused", lambda: reused.extraction, session_only=True
+        )
+    else:
+        extraction = results.get_or_compute(
+            upload_key,
+            "extraction",
+            lambda: process_diagnosis_report(file_bytes)   # 🔧 CHANGED
+        )
 
 # 🔧 ADDED SAFETY
 if not extraction.get("details") or not extraction.get("summary_data"):
@@ -162,7 +247,31 @@ summary = extraction["summary_data"]
 # -------------------------------------------------
 # TREATMENT PLAN
 # -------------------------------------------------
-plan = generate_full_care_plan(patient, summary)
+if reused is not None:
+    plan = results.get_or_compute(upload_key, "plan:reused", lambda: reused.plan, session_only=True)
+else:
+    plan = results.get_or_compute(
+        upload_key,
+        "plan",
+        lambda: generate_full_care_plan(patient, summary)
+    )
+
+# Index fresh analyses so later re-uploads can reuse them, and add them
+# to the patient's journey (once per upload)
+if reused is None:
+    results.get_or_compute(
+        upload_key,
+        "near_duplicate_indexed",
+        lambda: remember(upload_key, upload_fp, extraction, plan)
+    )
+    results.get_or_compute(
+        upload_key,
+        "journey_recorded",
+        lambda: record_upload(JourneyRecord(upload_key, checked.kind, extraction, plan))
+    )
+
+# Render the PDF in the background while the page is drawn
+pdf_key = prerender_treatment_plan_pdf(patient, summary, plan)
 
 patient_name = patient.get("name", "Not mentioned")
 patient_age = patient.get("age", "Not mentioned")
@@ -257,17 +366,41 @@ Follow-up Frequency: {appt.get("follow_up_frequency", "N/A")}
 </div>
 """, unsafe_allow_html=True)
 
+# -------------------------------------------------
+# PATIENT JOURNEY
+# -------------------------------------------------
+# Indexed lookup of earlier reports: nothing is reprocessed. Linked by
+# record number or name + date of birth only, never by name alone
+history = patient_history(patient, exclude=upload_key)
+
+st.markdown('<div class="section-header">Patient Journey</div>', unsafe_allow_html=True)
+
+if history:
+    st.table([
+        {
+            "Uploaded": time.strftime("%d %b %Y", time.localtime(entry.report_date)),
+            "Report Type": entry.report_type.title(),
+            "Diagnosis": entry.diagnosis
+        }
+        for entry in history
+    ])
+else:
+    st.markdown("""
+<div class="info-panel">
+    No earlier reports on record for this patient (reports are linked by
+    hospital record number, or name and date of birth).
+</div>
+""", unsafe_allow_html=True)
+
 # -------------------------------------------------
 # DOWNLOAD PDF
 # -------------------------------------------------
 st.markdown('<div class="section-header">Download Treatment Report</div>', unsafe_allow_html=True)
 
-if st.button("📄 Download Treatment Plan PDF"):
-    pdf_file = build_treatment_plan_pdf(patient, summary, plan)
-    with open(pdf_file, "rb") as f:
-        st.download_button(
-            "⬇️ Download PDF",
-            f,
-            file_name=pdf_file,
-            mime="application/pdf"
-        )
+# Cached bytes: the click only streams them
+st.download_button(
+    "📄 Download Treatment Plan PDF",
+    rendered_pdf(pdf_key, (patient, summary, plan)),
+    file_name=DEFAULT_FILENAME,
+    mime="application/pdf"
+)